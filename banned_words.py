@@ -27,6 +27,9 @@ BANNED_WORDS = [
     "бабло", "баблишко", "заработок"
 ]
 
+# Версия списка: увеличивается при каждом изменении, по ней сбрасываются кэши
+_banned_words_version = 0
+
 def check_banned_words(text: str) -> tuple[bool, list[str]]:
     """
     Проверяет текст на наличие запрещенных слов
@@ -50,6 +53,10 @@ def get_banned_words_count() -> int:
     """Возвращает количество запрещенных слов в списке"""
     return len(BANNED_WORDS)
 
+def get_banned_words_version() -> int:
+    """Возвращает версию списка запрещенных слов (меняется при добавлении и удалении)"""
+    return _banned_words_version
+
 def add_banned_word(word: str) -> bool:
     """
     Добавляет новое запрещенное слово в список
@@ -60,12 +67,39 @@ def add_banned_word(word: str) -> bool:
     Returns:
         bool: True если слово было добавлено, False если уже существует
     """
+    global _banned_words_version
     word_lower = word.lower()
     if word_lower not in [w.lower() for w in BANNED_WORDS]:
         BANNED_WORDS.append(word)
+        _banned_words_version += 1
         return True
     return False
 
+def add_banned_words(words: list[str]) -> int:
+    """
+    Добавляет несколько запрещенных слов за один проход по списку
+    
+    Args:
+        words (list[str]): Слова для добавления
+        
+    Returns:
+        int: Количество действительно добавленных слов
+    """
+    global _banned_words_version
+    known = {w.lower() for w in BANNED_WORDS}
+    added_count = 0
+    
+    for word in words:
+        word_lower = word.lower()
+        if word_lower not in known:
+            known.add(word_lower)
+            BANNED_WORDS.append(word)
+            added_count += 1
+    
+    if added_count:
+        _banned_words_version += 1
+    return added_count
+
 def remove_banned_word(word: str) -> bool:
     """
     Удаляет запрещенное слово из списка
@@ -76,8 +110,10 @@ def remove_banned_word(word: str) -> bool:
     Returns:
         bool: True если слово было удалено, False если не найдено
     """
+    global _banned_words_version
     try:
         BANNED_WORDS.remove(word)
+        _banned_words_version += 1
         return True
     except ValueError:
         return False
\ No newline at end of file
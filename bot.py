@@ -23,7 +23,7 @@ from telegram.constants import ChatMemberStatus, ParseMode
 from telegram.error import TelegramError
 
 from config import bot_config, BOT_MESSAGES, VIOLATION_TYPES, MODERATION_ACTIONS
-from database import db, User
+from database import get_db, User
 from openai_analyzer import analyzer, AnalysisResult
 from banned_words import check_banned_words
 
@@ -63,6 +63,8 @@ class ModerationBot:
         self.logger = logging.getLogger(__name__)
         self.application = None
         self.is_running = False
+        # Устанавливается в stop(): консольный и серверный режимы ждут его вместо опроса is_running
+        self.stopped_event = asyncio.Event()
         
         # Статистика работы
         self.stats = {
@@ -165,6 +167,8 @@ class ModerationBot:
             await self.application.start()
             await self.application.updater.start_polling()
             
+            # Новое событие на каждый запуск: оно привязывается к циклу, в котором его ждут
+            self.stopped_event = asyncio.Event()
             self.is_running = True
             self.stats['bot_started'] = datetime.now()
             
@@ -190,10 +194,15 @@ class ModerationBot:
                     await self.application.stop()
                     await self.application.shutdown()
                 
+                # Закрываем keep-alive соединения к OpenAI
+                await analyzer.close()
+                
                 self.logger.info("Бот остановлен")
                 
             except Exception as e:
                 self.logger.error(f"Ошибка остановки бота: {e}")
+            finally:
+                self.stopped_event.set()
         else:
             self.logger.info("Бот уже остановлен или не был запущен")
     
@@ -202,7 +211,7 @@ class ModerationBot:
         while self.is_running:
             try:
                 # Очистка истекших банов каждые 5 минут
-                cleaned_bans = db.cleanup_expired_bans()
+                cleaned_bans = get_db().cleanup_expired_bans()
                 if cleaned_bans > 0:
                     self.logger.info(f"Очищено {cleaned_bans} истекших банов")
 
@@ -234,7 +243,7 @@ class ModerationBot:
         self.stats['messages_processed'] += 1
         
         # Создаем/обновляем пользователя в БД
-        db_user = db.create_or_update_user(
+        db_user = get_db().create_or_update_user(
             user_id=user.id,
             username=user.username,
             first_name=user.first_name,
@@ -242,13 +251,13 @@ class ModerationBot:
         )
     
         # Обновляем активность пользователя
-        db.update_user_activity(user.id, increment_messages=True)
+        get_db().update_user_activity(user.id, increment_messages=True)
     
         # Обновляем уровень доверия
-        trust_level = db.update_trust_level(user.id)
+        trust_level = get_db().update_trust_level(user.id)
         
         # Проверяем, не заблокирован ли пользователь
-        if db.is_user_banned(user.id):
+        if get_db().is_user_banned(user.id):
             await self.delete_message_safe(message)
             return
         
@@ -285,7 +294,7 @@ class ModerationBot:
             await self.delete_message_safe(message)
         
         # Добавляем нарушение в БД
-        db.add_violation(
+        get_db().add_violation(
             user_id=user_id,
             message_id=message.message_id,
             violation_type="bad_language",
@@ -296,17 +305,17 @@ class ModerationBot:
         # Определяем действие
         if bot_config.AUTO_BAN_ON_BANNED_WORDS:
             # Банируем пользователя
-            db.ban_user(user_id, permanent=True)
+            get_db().ban_user(user_id, permanent=True)
             await self.notify_user_action(message, "banned", "Использование запрещенной лексики")
             self.stats['users_banned'] += 1
         else:
             # Выдаем предупреждение
-            warnings_count = db.add_warning(user_id)
+            warnings_count = get_db().add_warning(user_id)
             await self.notify_user_action(message, "warned", f"Предупреждение {warnings_count}")
             
             # Проверяем, не превышен ли лимит предупреждений
             if warnings_count >= bot_config.WARNING_THRESHOLD:
-                db.ban_user(user_id, bot_config.BAN_DURATION_MINUTES)
+                get_db().ban_user(user_id, bot_config.BAN_DURATION_MINUTES)
                 await self.notify_user_action(message, "banned", "Превышен лимит предупреждений")
                 self.stats['users_banned'] += 1
             else:
@@ -350,7 +359,7 @@ class ModerationBot:
             recommended_action = analyzer.get_recommended_action(analysis, user.warnings_count)
             
             # Добавляем нарушение в БД
-            db.add_violation(
+            get_db().add_violation(
                 user_id=message.from_user.id,
                 message_id=message.message_id,
                 violation_type=analysis.violation_type or "ai_detected",
@@ -395,7 +404,7 @@ class ModerationBot:
             return False
         
         # Получаем текущий уровень доверия
-        trust_level = db.calculate_trust_level(message.from_user.id)
+        trust_level = get_db().calculate_trust_level(message.from_user.id)
         
         # Если пользователь доверенный, пропускаем проверку
         if trust_level == "trusted":
@@ -406,14 +415,14 @@ class ModerationBot:
         self.logger.info(f"Пользователь {message.from_user.id} (уровень: {trust_level}) отправил подозрительные ссылки: {suspicious_links}")
         
         # Увеличиваем счетчик нарушений по ссылкам
-        violations_count = db.add_link_violation(message.from_user.id)
+        violations_count = get_db().add_link_violation(message.from_user.id)
         
         # Удаляем сообщение если включено автоудаление
         if bot_config.AUTO_DELETE_LINKS_FROM_NEW:
             await self.delete_message_safe(message)
         
         # Добавляем нарушение в БД
-        db.add_violation(
+        get_db().add_violation(
             user_id=message.from_user.id,
             message_id=message.message_id,
             violation_type="suspicious_links",
@@ -434,7 +443,7 @@ class ModerationBot:
             
         elif violations_count >= 2 and bot_config.BAN_ON_REPEATED_LINK_VIOLATION:
             # Повторное нарушение - бан
-            db.ban_user(message.from_user.id, bot_config.BAN_DURATION_MINUTES)
+            get_db().ban_user(message.from_user.id, bot_config.BAN_DURATION_MINUTES)
             ban_text = (
                 f"🚫 Вы заблокированы за повторную отправку ссылок.\n"
                 f"⏰ Блокировка на {bot_config.BAN_DURATION_MINUTES} минут."
@@ -456,7 +465,7 @@ class ModerationBot:
         await self.delete_message_safe(message)
         
         # Добавляем нарушение в БД
-        db.add_violation(
+        get_db().add_violation(
             user_id=user_id,
             message_id=message.message_id,
             violation_type=spam_result.spam_type,
@@ -466,7 +475,7 @@ class ModerationBot:
         
         # Выполняем действие
         if spam_result.action == "warn":
-            warnings_count = db.add_warning(user_id)
+            warnings_count = get_db().add_warning(user_id)
             await self.notify_user_action(message, "warned", f"Спам: {spam_result.reason}")
             
             # Отправляем предупреждение в ЛС
@@ -480,12 +489,12 @@ class ModerationBot:
             
             # Проверяем лимит предупреждений
             if warnings_count >= bot_config.WARNING_THRESHOLD:
-                db.ban_user(user_id, bot_config.BAN_DURATION_MINUTES)
+                get_db().ban_user(user_id, bot_config.BAN_DURATION_MINUTES)
                 await self.notify_user_action(message, "banned", "Превышен лимит предупреждений")
                 self.stats['users_banned'] += 1
         
         elif spam_result.action == "mute":
-            db.ban_user(user_id, bot_config.SPAM_BAN_DURATION)
+            get_db().ban_user(user_id, bot_config.SPAM_BAN_DURATION)
             await self.notify_user_action(message, "muted", f"Спам: {spam_result.reason}")
             
             mute_text = (
@@ -496,7 +505,7 @@ class ModerationBot:
             self.stats['users_banned'] += 1
         
         elif spam_result.action == "ban":
-            db.ban_user(user_id, bot_config.REPEATED_SPAM_BAN_DURATION)
+            get_db().ban_user(user_id, bot_config.REPEATED_SPAM_BAN_DURATION)
             await self.notify_user_action(message, "banned", f"Множественный спам: {spam_result.reason}")
             
             ban_text = (
@@ -530,25 +539,25 @@ class ModerationBot:
             await self.notify_user_action(message, "message_deleted", reason)
             
         elif action == "warn":
-            warnings_count = db.add_warning(user_id)
+            warnings_count = get_db().add_warning(user_id)
             await self.notify_user_action(message, "warned", f"Предупреждение {warnings_count}: {reason}")
             self.stats['users_warned'] += 1
             
             # Проверяем лимит предупреждений
             if warnings_count >= bot_config.WARNING_THRESHOLD:
-                db.ban_user(user_id, bot_config.BAN_DURATION_MINUTES)
+                get_db().ban_user(user_id, bot_config.BAN_DURATION_MINUTES)
                 await self.notify_user_action(message, "banned", "Превышен лимит предупреждений")
                 self.stats['users_banned'] += 1
                 
         elif action == "mute":
             # Сообщение уже удалено
-            db.ban_user(user_id, bot_config.MUTE_DURATION)
+            get_db().ban_user(user_id, bot_config.MUTE_DURATION)
             await self.notify_user_action(message, "muted", reason)
             self.stats['users_banned'] += 1
             
         elif action == "ban":
             # Сообщение уже удалено
-            db.ban_user(user_id, permanent=True)  # Постоянный бан
+            get_db().ban_user(user_id, permanent=True)  # Постоянный бан
             await self.notify_user_action(message, "banned", reason)
             self.stats['users_banned'] += 1
     
@@ -624,13 +633,13 @@ class ModerationBot:
                 await update.message.reply_text("❌ Некорректный ID пользователя")
                 return
 
-        user = db.get_user(user_id)
+        user = get_db().get_user(user_id)
         if not user:
             await update.message.reply_text("❌ Пользователь не найден")
             return
 
         # Вычисляем текущий уровень доверия
-        trust_level = db.calculate_trust_level(user_id)
+        trust_level = get_db().calculate_trust_level(user_id)
         
         trust_level_names = {
             'new': 'Новый',
@@ -661,7 +670,7 @@ class ModerationBot:
             await update.message.reply_text("❌ Команда доступна только администраторам")
             return
 
-        stats = db.get_trust_statistics()
+        stats = get_db().get_trust_statistics()
         
         trust_level_names = {
             'new': 'Новые',
@@ -682,7 +691,7 @@ class ModerationBot:
         stats_text += f"\n📈 *Среднее сообщений у доверенных:* {stats.get('avg_trusted_messages', 0)}"
         
         # Добавляем общую статистику нарушений
-        general_stats = db.get_statistics()
+        general_stats = get_db().get_statistics()
         violations = general_stats.get('top_violations', [])
         link_violations = next((count for violation_type, count in violations if violation_type == 'suspicious_links'), 0)
         
@@ -709,7 +718,7 @@ class ModerationBot:
                 return
             
             # Обновляем уровень доверия
-            with sqlite3.connect(db.db_path) as conn:
+            with sqlite3.connect(get_db().db_path) as conn:
                 cursor = conn.cursor()
                 cursor.execute("""
                 UPDATE users 
@@ -740,7 +749,7 @@ class ModerationBot:
         
         # Обновляем информацию о пользователе
         user = chat_member_update.new_chat_member.user
-        db_user = db.create_or_update_user(
+        db_user = get_db().create_or_update_user(
             user_id=user.id,
             username=user.username,
             first_name=user.first_name,
@@ -750,7 +759,7 @@ class ModerationBot:
         # Если пользователь присоединился к чату, отмечаем время
         if (chat_member_update.old_chat_member.status in [ChatMemberStatus.LEFT, ChatMemberStatus.KICKED] and
             chat_member_update.new_chat_member.status == ChatMemberStatus.MEMBER):
-            db.set_user_joined_chat(user.id)
+            get_db().set_user_joined_chat(user.id)
             self.logger.info(f"Пользователь {user.id} присоединился к чату")
     
     # Команды бота
@@ -820,7 +829,7 @@ class ModerationBot:
             await update.message.reply_text("❌ Команда доступна только администраторам")
             return
         
-        stats = db.get_statistics()
+        stats = get_db().get_statistics()
         bot_uptime = datetime.now() - self.stats['bot_started'] if self.stats['bot_started'] else timedelta(0)
         
         stats_text = f"""
@@ -864,7 +873,7 @@ class ModerationBot:
             user_id = int(context.args[0])
             duration = int(context.args[1]) if len(context.args) > 1 else None
             
-            db.ban_user(user_id, duration)
+            get_db().ban_user(user_id, duration)
             
             duration_text = f"на {duration} минут" if duration else "навсегда"
             await update.message.reply_text(f"✅ Пользователь {user_id} заблокирован {duration_text}")
@@ -884,7 +893,7 @@ class ModerationBot:
         
         try:
             user_id = int(context.args[0])
-            db.unban_user(user_id)
+            get_db().unban_user(user_id)
             await update.message.reply_text(f"✅ Пользователь {user_id} разблокирован")
             
         except ValueError:
@@ -904,7 +913,7 @@ class ModerationBot:
             user_id = int(context.args[0])
             duration = int(context.args[1]) if len(context.args) > 1 else bot_config.BAN_DURATION_MINUTES
             
-            db.ban_user(user_id, duration)
+            get_db().ban_user(user_id, duration)
             await update.message.reply_text(f"✅ Пользователь {user_id} ограничен на {duration} минут")
             
         except ValueError:
@@ -922,7 +931,7 @@ class ModerationBot:
         
         try:
             user_id = int(context.args[0])
-            warnings_count = db.add_warning(user_id)
+            warnings_count = get_db().add_warning(user_id)
             await update.message.reply_text(f"✅ Пользователю {user_id} выдано предупреждение. Всего: {warnings_count}")
             
         except ValueError:
@@ -940,13 +949,13 @@ class ModerationBot:
         
         try:
             user_id = int(context.args[0])
-            user = db.get_user(user_id)
+            user = get_db().get_user(user_id)
             
             if not user:
                 await update.message.reply_text("❌ Пользователь не найден")
                 return
             
-            violations = db.get_user_violations(user_id, 5)
+            violations = get_db().get_user_violations(user_id, 5)
             
             info_text = f"""
 👤 *Информация о пользователе {user_id}:*
@@ -1068,7 +1077,7 @@ class ModerationBot:
             await update.message.reply_text("❌ Команда доступна только администраторам")
             return
         
-        cleaned_count = db.cleanup_expired_bans()
+        cleaned_count = get_db().cleanup_expired_bans()
         await update.message.reply_text(f"✅ Очищено {cleaned_count} истекших банов")
     
     async def is_admin(self, user_id: int) -> bool:
@@ -1100,7 +1109,7 @@ class ModerationBot:
         user_id = update.effective_user.id
         
         # Проверяем, заблокирован ли пользователь
-        if not db.is_user_banned(user_id):
+        if not get_db().is_user_banned(user_id):
             await update.message.reply_text("❌ Вы не заблокированы, обжалование не требуется")
             return
         
@@ -1122,7 +1131,7 @@ class ModerationBot:
             await update.message.reply_text("❌ Текст обжалования слишком длинный (максимум 1000 символов)")
             return
         
-        appeal_id = db.add_appeal(user_id, appeal_text)
+        appeal_id = get_db().add_appeal(user_id, appeal_text)
         
         if appeal_id == -1:
             await update.message.reply_text("❌ У вас уже есть активное обжалование. Дождитесь рассмотрения.")
@@ -1160,7 +1169,7 @@ class ModerationBot:
             await update.message.reply_text("❌ Команда доступна только администраторам")
             return
         
-        appeals = db.get_pending_appeals()
+        appeals = get_db().get_pending_appeals()
         
         if not appeals:
             await update.message.reply_text("📭 Нет ожидающих обжалований")
@@ -1169,7 +1178,7 @@ class ModerationBot:
         appeals_text = "📮 Активные обжалования:\n\n"
         
         for appeal in appeals[:10]:  # Показываем максимум 10
-            user = db.get_user(appeal.user_id)
+            user = get_db().get_user(appeal.user_id)
             user_name = f"{user.first_name or 'Неизвестно'}" if user else "Неизвестно"
             
             appeals_text += (
@@ -1198,7 +1207,7 @@ class ModerationBot:
             await update.message.reply_text("❌ Некорректный ID обжалования")
             return
         
-        appeal = db.get_appeal_by_id(appeal_id)
+        appeal = await get_db().get_appeal_by_id_async(appeal_id)
         if not appeal:
             await update.message.reply_text("❌ Обжалование не найдено")
             return
@@ -1208,7 +1217,7 @@ class ModerationBot:
             return
         
         # Запрашиваем подтверждение
-        user = db.get_user(appeal.user_id)
+        user = get_db().get_user(appeal.user_id)
         user_info = f"{user.first_name or 'Неизвестно'} (ID: {appeal.user_id})" if user else f"ID: {appeal.user_id}"
         
         confirmation_text = (
@@ -1239,7 +1248,7 @@ class ModerationBot:
             await update.message.reply_text("❌ Некорректный ID обжалования")
             return
         
-        appeal = db.get_appeal_by_id(appeal_id)
+        appeal = await get_db().get_appeal_by_id_async(appeal_id)
         if not appeal:
             await update.message.reply_text("❌ Обжалование не найдено")
             return
@@ -1249,7 +1258,7 @@ class ModerationBot:
             return
         
         admin_id = update.effective_user.id
-        success = db.update_appeal_status(appeal_id, "rejected", admin_id, reason)
+        success = await get_db().update_appeal_status_async(appeal_id, "rejected", admin_id, reason)
         
         if success:
             await update.message.reply_text(f"✅ Обжалование #{appeal_id} отклонено")
@@ -1281,7 +1290,7 @@ class ModerationBot:
             await update.message.reply_text("❌ Некорректный ID обжалования")
             return
         
-        appeal = db.get_appeal_by_id(appeal_id)
+        appeal = await get_db().get_appeal_by_id_async(appeal_id)
         if not appeal or appeal.status != "pending":
             await update.message.reply_text("❌ Обжалование не найдено или уже рассмотрено")
             return
@@ -1289,11 +1298,11 @@ class ModerationBot:
         admin_id = update.effective_user.id
         
         # Принимаем обжалование
-        success = db.update_appeal_status(appeal_id, "approved", admin_id, "Обжалование принято")
+        success = await get_db().update_appeal_status_async(appeal_id, "approved", admin_id, "Обжалование принято")
         
         if success:
             # Разблокируем пользователя
-            db.unban_user(appeal.user_id)
+            get_db().unban_user(appeal.user_id)
             
             await update.message.reply_text(f"✅ Обжалование #{appeal_id} принято, пользователь разблокирован")
             
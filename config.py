@@ -4,6 +4,7 @@
 """
 
 import os
+import re
 from typing import Dict, List
 from dataclasses import dataclass, field
 
@@ -259,38 +260,66 @@ def load_config_from_env() -> BotConfig:
 
 def save_config_to_env(config: BotConfig) -> None:
     """Сохраняет конфигурацию в переменные окружения"""
-    os.environ["BOT_TOKEN"] = config.BOT_TOKEN
-    os.environ["CHAT_ID"] = config.CHAT_ID
-    os.environ["ADMIN_CHAT_ID"] = config.ADMIN_CHAT_ID
-    os.environ["OPENAI_API_KEY"] = config.OPENAI_API_KEY
-    os.environ["AUTO_DELETE_BANNED_WORDS"] = str(config.AUTO_DELETE_BANNED_WORDS).lower()
-    os.environ["AUTO_BAN_ON_BANNED_WORDS"] = str(config.AUTO_BAN_ON_BANNED_WORDS).lower()
-    os.environ["USE_OPENAI_ANALYSIS"] = str(config.USE_OPENAI_ANALYSIS).lower()
-    os.environ["BAN_DURATION_MINUTES"] = str(config.BAN_DURATION_MINUTES)
-    os.environ["WARNING_THRESHOLD"] = str(config.WARNING_THRESHOLD)
-    os.environ["OPENAI_ANALYSIS_THRESHOLD"] = str(config.OPENAI_ANALYSIS_THRESHOLD)
-    os.environ["TRUST_SYSTEM_ENABLED"] = str(config.TRUST_SYSTEM_ENABLED).lower()
-    os.environ["TRUST_DAYS_THRESHOLD"] = str(config.TRUST_DAYS_THRESHOLD)
-    os.environ["TRUST_MESSAGES_THRESHOLD"] = str(config.TRUST_MESSAGES_THRESHOLD)
-    os.environ["LINK_DETECTION_ENABLED"] = str(config.LINK_DETECTION_ENABLED).lower()
-    os.environ["AUTO_DELETE_LINKS_FROM_NEW"] = str(config.AUTO_DELETE_LINKS_FROM_NEW).lower()
-    os.environ["BAN_ON_REPEATED_LINK_VIOLATION"] = str(config.BAN_ON_REPEATED_LINK_VIOLATION).lower()
-    if config.TRUSTED_DOMAINS:
-        os.environ["TRUSTED_DOMAINS"] = ",".join(config.TRUSTED_DOMAINS)
-    else:
-        os.environ["TRUSTED_DOMAINS"] = "t.me,youtube.com,youtu.be"
+    os.environ.update({
+        "BOT_TOKEN": config.BOT_TOKEN,
+        "CHAT_ID": config.CHAT_ID,
+        "ADMIN_CHAT_ID": config.ADMIN_CHAT_ID,
+        "OPENAI_API_KEY": config.OPENAI_API_KEY,
+        "AUTO_DELETE_BANNED_WORDS": str(config.AUTO_DELETE_BANNED_WORDS).lower(),
+        "AUTO_BAN_ON_BANNED_WORDS": str(config.AUTO_BAN_ON_BANNED_WORDS).lower(),
+        "USE_OPENAI_ANALYSIS": str(config.USE_OPENAI_ANALYSIS).lower(),
+        "BAN_DURATION_MINUTES": str(config.BAN_DURATION_MINUTES),
+        "WARNING_THRESHOLD": str(config.WARNING_THRESHOLD),
+        "OPENAI_ANALYSIS_THRESHOLD": str(config.OPENAI_ANALYSIS_THRESHOLD),
+        "TRUST_SYSTEM_ENABLED": str(config.TRUST_SYSTEM_ENABLED).lower(),
+        "TRUST_DAYS_THRESHOLD": str(config.TRUST_DAYS_THRESHOLD),
+        "TRUST_MESSAGES_THRESHOLD": str(config.TRUST_MESSAGES_THRESHOLD),
+        "LINK_DETECTION_ENABLED": str(config.LINK_DETECTION_ENABLED).lower(),
+        "AUTO_DELETE_LINKS_FROM_NEW": str(config.AUTO_DELETE_LINKS_FROM_NEW).lower(),
+        "BAN_ON_REPEATED_LINK_VIOLATION": str(config.BAN_ON_REPEATED_LINK_VIOLATION).lower(),
+        "TRUSTED_DOMAINS": ",".join(config.TRUSTED_DOMAINS) if config.TRUSTED_DOMAINS else "t.me,youtube.com,youtu.be",
+    })
+
+# Время изменения .env (нс) на момент последней загрузки
+_loaded_env_mtime = None
+
+def env_file_mtime(env_file: str = ".env") -> int:
+    """Время последнего изменения .env в наносекундах (0, если файла нет)"""
+    try:
+        return os.stat(env_file).st_mtime_ns
+    except OSError:
+        return 0
+
+def env_file_changed(env_file: str = ".env") -> bool:
+    """Изменился ли .env с момента последней загрузки"""
+    return env_file_mtime(env_file) != _loaded_env_mtime
+
+# Строка .env: [export] КЛЮЧ=значение; комментарии и строки без "=" не совпадают
+_ENV_LINE = re.compile(r'^[ \t]*(?:export[ \t]+)?([A-Za-z_][A-Za-z0-9_]*)[ \t]*=[ \t]*(.*?)[ \t]*$', re.M)
+
+def parse_env(text: str) -> Dict[str, str]:
+    """Разбор содержимого .env за один проход регулярного выражения"""
+    env = {}
+    for key, value in _ENV_LINE.findall(text):
+        if len(value) >= 2 and value[0] == value[-1] and value[0] in '"\'':
+            # Значение в кавычках берем как есть
+            value = value[1:-1]
+        else:
+            # Комментарий в конце строки: "КЛЮЧ=значение  # пояснение"
+            value = value.split(' #', 1)[0].rstrip()
+        env[key] = value
+    return env
 
 def load_env_file():
     """Загрузка переменных окружения из .env файла"""
+    global _loaded_env_mtime
     env_file = ".env"
+    # Время берем до чтения: запись во время чтения заметим при следующей проверке
+    _loaded_env_mtime = env_file_mtime(env_file)
     if os.path.exists(env_file):
         try:
             with open(env_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if line and not line.startswith('#') and '=' in line:
-                        key, value = line.split('=', 1)
-                        os.environ[key.strip()] = value.strip()
+                os.environ.update(parse_env(f.read()))
             print(f"Загружена конфигурация из {env_file}")
         except Exception as e:
             print(f"Ошибка загрузки .env файла: {e}")
@@ -336,8 +365,12 @@ LOG_TO_CONSOLE={str(config_obj.LOG_TO_CONSOLE).lower()}
 """
     
     try:
-        with open('.env', 'w', encoding='utf-8') as f:
+        # Пишем во временный файл и подменяем .env целиком: при сбое записи
+        # старый файл остается целым, а не обрезанным на середине
+        tmp_file = '.env.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
             f.write(env_content)
+        os.replace(tmp_file, '.env')
         print("Настройки сохранены в .env файл")
     except Exception as e:
         print(f"Ошибка сохранения в .env файл: {e}")
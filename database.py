@@ -5,12 +5,117 @@
 
 import sqlite3
 import logging
-from datetime import datetime, timedelta
+import asyncio
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
 from typing import Optional, List, Dict, Tuple
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
+from enum import Enum
 from config import bot_config
 import os
 
+# Явный порядок колонок для выборок с позиционной распаковкой
+USER_COLUMNS = (
+    "user_id, username, first_name, last_name, warnings_count, is_banned, ban_until, "
+    "created_at, updated_at, joined_chat_at, messages_count, trust_level, "
+    "link_violations_count, last_message_at"
+)
+VIOLATION_COLUMNS = (
+    "id, user_id, message_id, violation_type, violation_text, action_taken, "
+    "ai_confidence, created_at"
+)
+APPEAL_COLUMNS = (
+    "id, user_id, appeal_text, status, admin_id, admin_response, created_at_ts, updated_at_ts"
+)
+
+# Текущее unix-время на стороне SQLite (время обжалований хранится как INTEGER)
+_NOW_EPOCH_SQL = "CAST(strftime('%s', 'now') AS INTEGER)"
+
+_GET_APPEAL_SQL = f"SELECT {APPEAL_COLUMNS} FROM appeals WHERE id = ?"
+_UPDATE_APPEAL_SQL = f"""
+UPDATE appeals 
+SET status = ?, admin_id = ?, admin_response = ?, updated_at_ts = {_NOW_EPOCH_SQL}
+WHERE id = ? AND (status IS NOT ? OR admin_id IS NOT ? OR admin_response IS NOT ?)
+RETURNING id
+"""
+_APPEAL_EXISTS_SQL = "SELECT 1 FROM appeals WHERE id = ?"
+
+# Пакетная запись обновлений обжалований
+APPEAL_WRITE_BATCH_SIZE = 32      # максимум обновлений в одной транзакции
+APPEAL_WRITE_BATCH_WINDOW = 0.05  # секунд ожидания попутных обновлений
+APPEAL_WRITE_RETRIES = 3          # попыток записи пакета при "database is locked"
+
+# Размер LRU-кэша обжалований в памяти
+APPEAL_CACHE_SIZE = 1024
+
+_fromisoformat = datetime.fromisoformat
+_fromtimestamp = datetime.fromtimestamp
+
+def _parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    """Преобразует строку ISO из БД в datetime"""
+    return _fromisoformat(value) if value else None
+
+class ConnectionPool:
+    """
+    Пул долгоживущих соединений с SQLite по схеме "много читателей, один писатель"
+    
+    В режиме WAL читатели не блокируются писателем, поэтому SELECT-запросы
+    берут соединения из очереди, а все изменения идут через одно
+    соединение для записи под блокировкой.
+    """
+    
+    def __init__(self, db_path: str, size: int = 5):
+        self.db_path = db_path
+        self._connections = queue.Queue(maxsize=size)
+        for _ in range(size):
+            self._connections.put(self._connect())
+        
+        self._writer = self._connect()
+        self._writer_lock = threading.Lock()
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Открывает соединение и один раз настраивает его"""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None,
+                               cached_statements=256)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA cache_size=-65536")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA mmap_size=268435456")
+        conn.execute("PRAGMA busy_timeout=5000")
+        conn.execute("PRAGMA wal_autocheckpoint=1000")
+        conn.execute("PRAGMA read_uncommitted=0")
+        return conn
+    
+    @contextmanager
+    def acquire(self):
+        """Взять соединение для чтения из пула и вернуть его после использования"""
+        conn = self._connections.get()
+        try:
+            yield conn
+        except Exception:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            self._connections.put(conn)
+    
+    @contextmanager
+    def write(self):
+        """Взять единственное соединение для записи"""
+        with self._writer_lock:
+            try:
+                yield self._writer
+            except Exception:
+                if self._writer.in_transaction:
+                    self._writer.rollback()
+                raise
+
 def check_database_file():
     """Проверка состояния файла базы данных"""
     from config import bot_config
@@ -67,6 +172,21 @@ class Appeal:
     created_at: datetime = None
     updated_at: datetime = None
 
+class AppealUpdateResult(Enum):
+    """Результат обновления обжалования"""
+    UPDATED = "updated"      # запись изменена
+    UNCHANGED = "unchanged"  # то же решение уже сохранено, запись не понадобилась
+    NOT_FOUND = "not_found"  # обжалования с таким ID нет
+
+def _appeal_row_factory(cursor: sqlite3.Cursor, row: tuple) -> Appeal:
+    """row_factory для выборок APPEAL_COLUMNS: строка сразу становится Appeal"""
+    aid, uid, text, status, admin_id, resp, created, updated = row
+    return Appeal(
+        aid, uid, text, status, admin_id, resp,
+        _fromtimestamp(created, timezone.utc) if created is not None else None,
+        _fromtimestamp(updated, timezone.utc) if updated is not None else None
+    )
+
 class ModerationDatabase:
     """Класс для работы с базой данных модерации"""
     
@@ -74,6 +194,19 @@ class ModerationDatabase:
         self.db_path = db_path or bot_config.DATABASE_FILE
         self.logger = logging.getLogger(__name__)
         self.init_database()
+        self.pool = ConnectionPool(self.db_path)
+        
+        # Очередь пакетной записи обновлений обжалований
+        self._appeal_updates = queue.Queue()
+        self._appeal_writer = None
+        self._appeal_writer_lock = threading.Lock()
+        
+        # LRU-кэш обжалований по ID, сбрасывается при обновлении
+        self._appeal_cache: "OrderedDict[int, Appeal]" = OrderedDict()
+        self._appeal_cache_lock = threading.Lock()
+        # Растет при каждом сбросе записей кэша: читатель, начавший выборку до
+        # обновления, не вернет в кэш устаревшую строку
+        self._appeal_cache_generation = 0
     
     def init_database(self):
         """Инициализация базы данных и создание таблиц"""
@@ -142,8 +275,8 @@ class ModerationDatabase:
                     status TEXT DEFAULT 'pending',
                     admin_id INTEGER,
                     admin_response TEXT,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    created_at_ts INTEGER DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
+                    updated_at_ts INTEGER DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
                     FOREIGN KEY (user_id) REFERENCES users (user_id)
                 )
                 """)
@@ -153,7 +286,9 @@ class ModerationDatabase:
                 cursor.execute("CREATE INDEX IF NOT EXISTS idx_violations_user_id ON violations(user_id)")
                 cursor.execute("CREATE INDEX IF NOT EXISTS idx_violations_created_at ON violations(created_at)")
                 cursor.execute("CREATE INDEX IF NOT EXISTS idx_appeals_user_id ON appeals(user_id)")
-                cursor.execute("CREATE INDEX IF NOT EXISTS idx_appeals_status ON appeals(status)")
+                # (status, user_id) покрывает и выборку по статусу, и поиск активного обжалования
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_appeals_status_user ON appeals(status, user_id)")
+                cursor.execute("DROP INDEX IF EXISTS idx_appeals_status")
                 
                 conn.commit()
                 
@@ -175,34 +310,35 @@ class ModerationDatabase:
     def get_user(self, user_id: int) -> Optional[User]:
         """Получить пользователя по ID"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
-                cursor = conn.cursor()
+            with self.pool.acquire() as conn:
+                row = conn.execute(
+                    f"SELECT {USER_COLUMNS} FROM users WHERE user_id = ?", (user_id,)
+                ).fetchone()
                 
-                cursor.execute("""
-                SELECT * FROM users WHERE user_id = ?
-                """, (user_id,))
-                
-                row = cursor.fetchone()
-                if row:
-                    return User(
-                        user_id=row['user_id'],
-                        username=row['username'],
-                        first_name=row['first_name'],
-                        last_name=row['last_name'],
-                        warnings_count=row['warnings_count'],
-                        is_banned=bool(row['is_banned']),
-                        ban_until=datetime.fromisoformat(row['ban_until']) if row['ban_until'] else None,
-                        created_at=datetime.fromisoformat(row['created_at']) if row['created_at'] else None,
-                        updated_at=datetime.fromisoformat(row['updated_at']) if row['updated_at'] else None,
-                        # Новые поля системы доверия
-                        joined_chat_at=datetime.fromisoformat(row['joined_chat_at']) if row['joined_chat_at'] else None,
-                        messages_count=row['messages_count'] or 0,
-                        trust_level=row['trust_level'] or 'new',
-                        link_violations_count=row['link_violations_count'] or 0,
-                        last_message_at=datetime.fromisoformat(row['last_message_at']) if row['last_message_at'] else None
-                    )
+            if not row:
                 return None
+            
+            (uid, username, first_name, last_name, warnings_count, is_banned, ban_until,
+             created_at, updated_at, joined_chat_at, messages_count, trust_level,
+             link_violations_count, last_message_at) = row
+            
+            return User(
+                user_id=uid,
+                username=username,
+                first_name=first_name,
+                last_name=last_name,
+                warnings_count=warnings_count,
+                is_banned=bool(is_banned),
+                ban_until=_parse_datetime(ban_until),
+                created_at=_parse_datetime(created_at),
+                updated_at=_parse_datetime(updated_at),
+                # Новые поля системы доверия
+                joined_chat_at=_parse_datetime(joined_chat_at),
+                messages_count=messages_count or 0,
+                trust_level=trust_level or 'new',
+                link_violations_count=link_violations_count or 0,
+                last_message_at=_parse_datetime(last_message_at)
+            )
                 
         except sqlite3.Error as e:
             self.logger.error(f"Ошибка получения пользователя {user_id}: {e}")
@@ -212,12 +348,13 @@ class ModerationDatabase:
                              first_name: str = None, last_name: str = None) -> User:
         """Создать или обновить пользователя"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            # Проверяем, существует ли пользователь (до взятия соединения из пула,
+            # get_user берет собственное)
+            existing_user = self.get_user(user_id)
+            
+            with self.pool.write() as conn:
                 cursor = conn.cursor()
                 
-                # Проверяем, существует ли пользователь
-                existing_user = self.get_user(user_id)
-                
                 if existing_user:
                     # Обновляем информацию о пользователе
                     cursor.execute("""
@@ -284,6 +421,28 @@ class ModerationDatabase:
                             self.logger.error(f"Ошибка добавления колонки {column_name}: {e}")
                             # НЕ останавливаем выполнение, продолжаем
                 
+                # Обжалования: время хранится как INTEGER unix-время вместо ISO-строк
+                cursor.execute("PRAGMA table_info(appeals)")
+                appeal_columns = [column[1] for column in cursor.fetchall()]
+                
+                try:
+                    for column_name in ("created_at_ts", "updated_at_ts"):
+                        if column_name not in appeal_columns:
+                            cursor.execute(f"ALTER TABLE appeals ADD COLUMN {column_name} INTEGER")
+                            self.logger.info(f"Добавлена колонка appeals.{column_name}")
+                    
+                    for old_column in ("created_at", "updated_at"):
+                        if old_column in appeal_columns:
+                            cursor.execute(f"""
+                            UPDATE appeals SET {old_column}_ts = CAST(strftime('%s', {old_column}) AS INTEGER)
+                            WHERE {old_column}_ts IS NULL
+                            """)
+                            conn.commit()
+                            cursor.execute(f"ALTER TABLE appeals DROP COLUMN {old_column}")
+                            self.logger.info(f"Колонка appeals.{old_column} перенесена в {old_column}_ts")
+                except sqlite3.Error as e:
+                    self.logger.error(f"Ошибка миграции времени обжалований: {e}")
+                
                 # Проверяем финальное состояние
                 cursor.execute("PRAGMA table_info(users)")
                 final_columns = [column[1] for column in cursor.fetchall()]
@@ -307,7 +466,7 @@ class ModerationDatabase:
     def add_warning(self, user_id: int) -> int:
         """Добавить предупреждение пользователю"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.write() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute("""
@@ -335,7 +494,7 @@ class ModerationDatabase:
             if duration_minutes:
                 ban_until = datetime.now() + timedelta(minutes=duration_minutes)
             
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.write() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute("""
@@ -354,7 +513,7 @@ class ModerationDatabase:
     def unban_user(self, user_id: int) -> None:
         """Разблокировать пользователя"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.write() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute("""
@@ -387,7 +546,7 @@ class ModerationDatabase:
                      violation_text: str, action_taken: str, ai_confidence: float = None) -> None:
         """Добавить запись о нарушении"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.write() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute("""
@@ -403,34 +562,23 @@ class ModerationDatabase:
             self.logger.error(f"Ошибка добавления нарушения: {e}")
             raise
     
-    def get_user_violations(self, user_id: int, limit: int = 10) -> List[Violation]:
-        """Получить список нарушений пользователя"""
+    def get_user_violations(self, user_id: int, limit: int = 10, offset: int = 0) -> List[Violation]:
+        """Получить список нарушений пользователя (offset - для постраничной загрузки)"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
-                cursor = conn.cursor()
-                
-                cursor.execute("""
-                SELECT * FROM violations 
+            with self.pool.acquire() as conn:
+                rows = conn.execute(f"""
+                SELECT {VIOLATION_COLUMNS} FROM violations 
                 WHERE user_id = ? 
                 ORDER BY created_at DESC 
-                LIMIT ?
-                """, (user_id, limit))
+                LIMIT ? OFFSET ?
+                """, (user_id, limit, offset)).fetchall()
                 
-                violations = []
-                for row in cursor.fetchall():
-                    violations.append(Violation(
-                        id=row['id'],
-                        user_id=row['user_id'],
-                        message_id=row['message_id'],
-                        violation_type=row['violation_type'],
-                        violation_text=row['violation_text'],
-                        action_taken=row['action_taken'],
-                        ai_confidence=row['ai_confidence'],
-                        created_at=datetime.fromisoformat(row['created_at']) if row['created_at'] else None
-                    ))
-                
-                return violations
+            return [
+                Violation(vid, uid, message_id, violation_type, violation_text,
+                          action_taken, ai_confidence, _parse_datetime(created_at))
+                for (vid, uid, message_id, violation_type, violation_text,
+                     action_taken, ai_confidence, created_at) in rows
+            ]
                 
         except sqlite3.Error as e:
             self.logger.error(f"Ошибка получения нарушений пользователя {user_id}: {e}")
@@ -442,7 +590,7 @@ class ModerationDatabase:
 
             self.logger.debug("Запрос статистики из базы данных")
 
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.acquire() as conn:
                 cursor = conn.cursor()
 
                 cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
@@ -496,7 +644,7 @@ class ModerationDatabase:
         # УБРАТЬ проверку bot_config.AUTO_CLEANUP_EXPIRED_BANS
         # Автоочистка всегда работает
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.write() as conn:
                 cursor = conn.cursor()
                 
                 now = datetime.now().isoformat()
@@ -521,7 +669,7 @@ class ModerationDatabase:
     def update_user_activity(self, user_id: int, increment_messages: bool = True) -> None:
         """Обновляет активность пользователя"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.write() as conn:
                 cursor = conn.cursor()
                 
                 update_query = "UPDATE users SET last_message_at = CURRENT_TIMESTAMP"
@@ -538,7 +686,7 @@ class ModerationDatabase:
     def set_user_joined_chat(self, user_id: int) -> None:
         """Устанавливает время присоединения к чату"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.write() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute("""
@@ -576,7 +724,7 @@ class ModerationDatabase:
         try:
             new_trust_level = self.calculate_trust_level(user_id)
             
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.write() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute("""
@@ -596,7 +744,7 @@ class ModerationDatabase:
     def add_link_violation(self, user_id: int) -> int:
         """Добавляет нарушение по ссылкам"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.write() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute("""
@@ -618,7 +766,7 @@ class ModerationDatabase:
     def get_trust_statistics(self) -> Dict:
         """Получить статистику системы доверия"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.acquire() as conn:
                 cursor = conn.cursor()
                 
                 # Статистика по уровням доверия
@@ -649,24 +797,21 @@ class ModerationDatabase:
     def recalculate_all_trust_levels(self) -> int:
         """Пересчитывает уровни доверия для всех пользователей"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
+            with self.pool.acquire() as conn:
                 # Получаем всех пользователей
-                cursor.execute("SELECT user_id FROM users")
-                user_ids = [row[0] for row in cursor.fetchall()]
-                
-                updated_count = 0
-                for user_id in user_ids:
-                    try:
-                        new_level = self.update_trust_level(user_id)
-                        updated_count += 1
-                        self.logger.debug(f"Обновлен уровень доверия для {user_id}: {new_level}")
-                    except Exception as e:
-                        self.logger.error(f"Ошибка пересчета для пользователя {user_id}: {e}")
-                
-                self.logger.info(f"Пересчитано уровней доверия: {updated_count}")
-                return updated_count
+                user_ids = [row[0] for row in conn.execute("SELECT user_id FROM users").fetchall()]
+            
+            updated_count = 0
+            for user_id in user_ids:
+                try:
+                    new_level = self.update_trust_level(user_id)
+                    updated_count += 1
+                    self.logger.debug(f"Обновлен уровень доверия для {user_id}: {new_level}")
+                except Exception as e:
+                    self.logger.error(f"Ошибка пересчета для пользователя {user_id}: {e}")
+            
+            self.logger.info(f"Пересчитано уровней доверия: {updated_count}")
+            return updated_count
                 
         except sqlite3.Error as e:
             self.logger.error(f"Ошибка пересчета всех уровней доверия: {e}")
@@ -675,9 +820,9 @@ class ModerationDatabase:
     def get_users_by_trust_level(self, trust_level: str, limit: int = 50) -> List[User]:
         """Получить пользователей по уровню доверия"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with self.pool.acquire() as conn:
                 cursor = conn.cursor()
+                cursor.row_factory = sqlite3.Row
                 
                 cursor.execute("""
                 SELECT * FROM users 
@@ -709,7 +854,7 @@ class ModerationDatabase:
     def add_appeal(self, user_id: int, appeal_text: str) -> int:
         """Добавить обжалование"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.write() as conn:
                 cursor = conn.cursor()
                 
                 # Проверяем, нет ли уже активного обжалования
@@ -721,9 +866,9 @@ class ModerationDatabase:
                 if cursor.fetchone():
                     return -1  # Уже есть активное обжалование
                 
-                cursor.execute("""
-                INSERT INTO appeals (user_id, appeal_text)
-                VALUES (?, ?)
+                cursor.execute(f"""
+                INSERT INTO appeals (user_id, appeal_text, created_at_ts, updated_at_ts)
+                VALUES (?, ?, {_NOW_EPOCH_SQL}, {_NOW_EPOCH_SQL})
                 """, (user_id, appeal_text))
                 
                 appeal_id = cursor.lastrowid
@@ -739,86 +884,207 @@ class ModerationDatabase:
     def get_pending_appeals(self) -> List[Appeal]:
         """Получить список ожидающих обжалований"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with self.pool.acquire() as conn:
                 cursor = conn.cursor()
+                cursor.row_factory = _appeal_row_factory
                 
-                cursor.execute("""
-                SELECT * FROM appeals 
+                return cursor.execute(f"""
+                SELECT {APPEAL_COLUMNS} FROM appeals 
                 WHERE status = 'pending'
-                ORDER BY created_at ASC
-                """)
-                
-                appeals = []
-                for row in cursor.fetchall():
-                    appeals.append(Appeal(
-                        id=row['id'],
-                        user_id=row['user_id'],
-                        appeal_text=row['appeal_text'],
-                        status=row['status'],
-                        admin_id=row['admin_id'],
-                        admin_response=row['admin_response'],
-                        created_at=datetime.fromisoformat(row['created_at']) if row['created_at'] else None,
-                        updated_at=datetime.fromisoformat(row['updated_at']) if row['updated_at'] else None
-                    ))
-                
-                return appeals
+                ORDER BY created_at_ts ASC
+                """).fetchall()
                 
         except sqlite3.Error as e:
             self.logger.error(f"Ошибка получения обжалований: {e}")
             return []
 
-    def update_appeal_status(self, appeal_id: int, status: str, admin_id: int, admin_response: str = None) -> bool:
-        """Обновить статус обжалования"""
+    def get_user_appeals(self, user_id: int, limit: int = 5) -> List[Appeal]:
+        """Получить последние обжалования пользователя"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.acquire() as conn:
                 cursor = conn.cursor()
+                cursor.row_factory = _appeal_row_factory
                 
-                cursor.execute("""
-                UPDATE appeals 
-                SET status = ?, admin_id = ?, admin_response = ?, updated_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-                """, (status, admin_id, admin_response, appeal_id))
-                
-                success = cursor.rowcount > 0
-                conn.commit()
-                
-                if success:
-                    self.logger.info(f"Обжалование {appeal_id} обновлено: {status}")
-                
-                return success
+                return cursor.execute(f"""
+                SELECT {APPEAL_COLUMNS} FROM appeals 
+                WHERE user_id = ?
+                ORDER BY created_at_ts DESC, id DESC
+                LIMIT ?
+                """, (user_id, limit)).fetchall()
                 
         except sqlite3.Error as e:
-            self.logger.error(f"Ошибка обновления обжалования: {e}")
+            self.logger.error(f"Ошибка получения обжалований пользователя {user_id}: {e}")
+            return []
+
+    def enqueue_update(self, appeal_id: int, status: str, admin_id: int,
+                       admin_response: str = None) -> Future:
+        """
+        Поставить обновление обжалования в очередь пакетной записи
+        
+        Returns:
+            Future: завершается после коммита, результат - AppealUpdateResult
+        """
+        with self._appeal_writer_lock:
+            # Поток создается заново, если прежний по какой-то причине завершился:
+            # иначе все последующие обновления ждали бы результата вечно
+            if self._appeal_writer is None or not self._appeal_writer.is_alive():
+                self._appeal_writer = threading.Thread(
+                    target=self._appeal_writer_loop, name="appeal-writer", daemon=True
+                )
+                self._appeal_writer.start()
+        
+        future = Future()
+        self._appeal_updates.put(((status, admin_id, admin_response, appeal_id), future))
+        return future
+    
+    def _appeal_writer_loop(self):
+        """Фоновый поток: собирает обновления за короткое окно и пишет их одной транзакцией"""
+        while True:
+            batch = [self._appeal_updates.get()]
+            deadline = time.monotonic() + APPEAL_WRITE_BATCH_WINDOW
+            
+            while len(batch) < APPEAL_WRITE_BATCH_SIZE:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._appeal_updates.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            
+            try:
+                self._write_appeal_batch(batch)
+            except Exception as e:
+                # Один неудачный пакет не должен останавливать поток записи
+                self.logger.error(f"Ошибка фоновой записи обжалований: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+    
+    def _write_appeal_batch(self, batch: List[Tuple[tuple, Future]]):
+        """Записать пакет обновлений обжалований в одной транзакции"""
+        # Отмененные вызывающим обновления не пишем; остальные переводятся в
+        # состояние running и больше не могут быть отменены до set_result
+        batch = [(params, future) for params, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        
+        for attempt in range(APPEAL_WRITE_RETRIES):
+            try:
+                with self.pool.write() as conn:
+                    # Явная транзакция: блокировка записи берется сразу, читатели WAL не блокируются
+                    conn.execute("BEGIN IMMEDIATE")
+                    # Построчно, а не executemany: каждому вызывающему нужен свой результат
+                    results = [self._apply_appeal_update(conn, params) for params, _ in batch]
+                    conn.commit()
+                break
+            except Exception as e:
+                # busy_timeout уже подождал внутри SQLite; на редкие оставшиеся
+                # блокировки повторяем с экспоненциальной паузой
+                retriable = isinstance(e, sqlite3.OperationalError) and "locked" in str(e)
+                if not retriable or attempt == APPEAL_WRITE_RETRIES - 1:
+                    for _, future in batch:
+                        future.set_exception(e)
+                    return
+                time.sleep(0.01 * (1 << attempt))
+        
+        with self._appeal_cache_lock:
+            for (params, _), result in zip(batch, results):
+                if result is AppealUpdateResult.UPDATED:
+                    self._appeal_cache.pop(params[-1], None)
+                    self._appeal_cache_generation += 1
+        
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+    
+    @staticmethod
+    def _apply_appeal_update(conn: sqlite3.Connection, params: tuple) -> AppealUpdateResult:
+        """Обновить одно обжалование; повторное то же решение не пишется в WAL"""
+        # Новые значения связываются второй раз для сравнения с текущими
+        if conn.execute(_UPDATE_APPEAL_SQL, params + params[:3]).fetchone() is not None:
+            return AppealUpdateResult.UPDATED
+        if conn.execute(_APPEAL_EXISTS_SQL, (params[-1],)).fetchone() is not None:
+            return AppealUpdateResult.UNCHANGED
+        return AppealUpdateResult.NOT_FOUND
+
+    def update_appeal_status(self, appeal_id: int, status: str, admin_id: int, admin_response: str = None) -> bool:
+        """Обновить статус обжалования"""
+        try:
+            result = self.enqueue_update(appeal_id, status, admin_id, admin_response).result()
+        except sqlite3.Error as e:
+            self.logger.error("Ошибка обновления обжалования %s: %s", appeal_id, e)
             return False
+        
+        return self._log_appeal_update(appeal_id, status, result)
+    
+    def _log_appeal_update(self, appeal_id: int, status: str, result: AppealUpdateResult) -> bool:
+        """Залогировать результат обновления; повтор того же решения считается успехом"""
+        if result is AppealUpdateResult.UPDATED:
+            self.logger.info("Обжалование %s обновлено: %s", appeal_id, status)
+        elif result is AppealUpdateResult.UNCHANGED:
+            self.logger.debug("Обжалование %s уже в статусе %s", appeal_id, status)
+        
+        return result is not AppealUpdateResult.NOT_FOUND
 
     def get_appeal_by_id(self, appeal_id: int) -> Optional[Appeal]:
-        """Получить обжалование по ID"""
+        """Получить обжалование по ID (копию: объект в кэше общий для всех вызывающих)"""
+        cache = self._appeal_cache
+        with self._appeal_cache_lock:
+            appeal = cache.get(appeal_id)
+            if appeal is not None:
+                cache.move_to_end(appeal_id)
+                return replace(appeal)
+            generation = self._appeal_cache_generation
+        
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with self.pool.acquire() as conn:
                 cursor = conn.cursor()
-                
-                cursor.execute("SELECT * FROM appeals WHERE id = ?", (appeal_id,))
-                row = cursor.fetchone()
-                
-                if row:
-                    return Appeal(
-                        id=row['id'],
-                        user_id=row['user_id'],
-                        appeal_text=row['appeal_text'],
-                        status=row['status'],
-                        admin_id=row['admin_id'],
-                        admin_response=row['admin_response'],
-                        created_at=datetime.fromisoformat(row['created_at']) if row['created_at'] else None,
-                        updated_at=datetime.fromisoformat(row['updated_at']) if row['updated_at'] else None
-                    )
-                
-                return None
-                
+                cursor.row_factory = _appeal_row_factory
+                appeal = cursor.execute(_GET_APPEAL_SQL, (appeal_id,)).fetchone()
         except sqlite3.Error as e:
-            self.logger.error(f"Ошибка получения обжалования {appeal_id}: {e}")
+            self.logger.error("Ошибка получения обжалования %s: %s", appeal_id, e)
+            return None
+        
+        if appeal is None:
             return None
+        
+        with self._appeal_cache_lock:
+            # Пока шла выборка, обжалования обновлялись: строка могла устареть
+            if generation == self._appeal_cache_generation:
+                cache[appeal_id] = appeal
+                if len(cache) > APPEAL_CACHE_SIZE:
+                    cache.popitem(last=False)
+        
+        return replace(appeal)
+
+    async def get_appeal_by_id_async(self, appeal_id: int) -> Optional[Appeal]:
+        """Получить обжалование по ID, не блокируя цикл событий"""
+        return await asyncio.to_thread(self.get_appeal_by_id, appeal_id)
+
+    async def update_appeal_status_async(self, appeal_id: int, status: str, admin_id: int,
+                                         admin_response: str = None) -> bool:
+        """Обновить статус обжалования, не блокируя цикл событий"""
+        try:
+            # shield: отмена вызывающего (таймаут обработчика, остановка бота) не
+            # отменяет саму запись - она уже в очереди и будет выполнена
+            result = await asyncio.shield(asyncio.wrap_future(
+                self.enqueue_update(appeal_id, status, admin_id, admin_response)
+            ))
+        except sqlite3.Error as e:
+            self.logger.error("Ошибка обновления обжалования %s: %s", appeal_id, e)
+            return False
+        
+        return self._log_appeal_update(appeal_id, status, result)
+
+# Глобальная инстанция базы данных создается при первом обращении, а не при импорте
+_db: Optional[ModerationDatabase] = None
+_db_lock = threading.Lock()
 
-# Глобальная инстанция базы данных
-db = ModerationDatabase()
\ No newline at end of file
+def get_db() -> ModerationDatabase:
+    """Получить общую инстанцию базы данных, открывая ее при первом вызове"""
+    global _db
+    if _db is None:
+        with _db_lock:
+            if _db is None:
+                _db = ModerationDatabase()
+    return _db
@@ -5,20 +5,220 @@
 
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext, filedialog
+import tkinter.font as tkfont
 import threading
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
 import logging
+import time
+from bisect import bisect_left
+from collections import OrderedDict, deque
 from datetime import datetime
+from functools import lru_cache, wraps
 import json
 import os
-from typing import Dict, Any
-
-from config import bot_config, save_config_to_env, VIOLATION_TYPES, MODERATION_ACTIONS
-from database import db
-from banned_words import BANNED_WORDS, add_banned_word, remove_banned_word
+import re
+import shutil
+from pathlib import Path
+from typing import Dict, Any, Tuple
+
+from config import bot_config, save_config_to_env, save_to_env_file, VIOLATION_TYPES, MODERATION_ACTIONS
+from database import get_db
+from banned_words import (BANNED_WORDS, add_banned_word, add_banned_words, remove_banned_word,
+                          get_banned_words_version)
 from bot import bot
 from openai_analyzer import analyzer
 
+# Параметры конфигурации, которые показывают вкладки настроек и системы доверия
+CONFIG_SNAPSHOT_KEYS = (
+    'BOT_TOKEN', 'CHAT_ID', 'ADMIN_CHAT_ID', 'OPENAI_API_KEY', 'OPENAI_MODEL',
+    'USE_OPENAI_ANALYSIS', 'OPENAI_ANALYSIS_THRESHOLD', 'AUTO_DELETE_BANNED_WORDS',
+    'AUTO_BAN_ON_BANNED_WORDS', 'BAN_DURATION_MINUTES', 'WARNING_THRESHOLD',
+    'TRUST_SYSTEM_ENABLED', 'LINK_DETECTION_ENABLED', 'TRUST_DAYS_THRESHOLD',
+    'TRUST_MESSAGES_THRESHOLD', 'AUTO_DELETE_LINKS_FROM_NEW',
+    'BAN_ON_REPEATED_LINK_VIOLATION', 'TRUSTED_DOMAINS',
+)
+
+# Поля вкладки настроек: (атрибут bot_config, переменная Tk, значение при сбросе).
+# Строковые значения при сохранении обрезаются, пустые при загрузке заменяются значением по умолчанию
+SETTINGS_FIELDS = (
+    ('BOT_TOKEN', 'bot_token_var', ""),
+    ('CHAT_ID', 'chat_id_var', ""),
+    ('ADMIN_CHAT_ID', 'admin_chat_id_var', ""),
+    ('OPENAI_API_KEY', 'openai_key_var', ""),
+    ('OPENAI_MODEL', 'openai_model_var', "gpt-3.5-turbo"),
+    ('USE_OPENAI_ANALYSIS', 'use_openai_var', True),
+    ('OPENAI_ANALYSIS_THRESHOLD', 'openai_threshold_var', 0.7),
+    ('AUTO_DELETE_BANNED_WORDS', 'auto_delete_var', True),
+    ('AUTO_BAN_ON_BANNED_WORDS', 'auto_ban_var', True),
+    ('BAN_DURATION_MINUTES', 'ban_duration_var', 60),
+    ('WARNING_THRESHOLD', 'warning_threshold_var', 3),
+)
+# Поля вкладки системы доверия: (атрибут bot_config, переменная Tk); TRUSTED_DOMAINS обрабатывается отдельно
+TRUST_SETTINGS_FIELDS = (
+    ('TRUST_SYSTEM_ENABLED', 'trust_enabled_var'),
+    ('LINK_DETECTION_ENABLED', 'link_detection_var'),
+    ('TRUST_DAYS_THRESHOLD', 'trust_days_var'),
+    ('TRUST_MESSAGES_THRESHOLD', 'trust_messages_var'),
+    ('AUTO_DELETE_LINKS_FROM_NEW', 'auto_delete_links_var'),
+    ('BAN_ON_REPEATED_LINK_VIOLATION', 'ban_repeated_links_var'),
+)
+
+# Названия уровней доверия: для одного пользователя и для групп в статистике
+TRUST_LEVEL_NAMES = {
+    'new': 'Новый',
+    'trusted': 'Доверенный',
+    'suspicious': 'Подозрительный'
+}
+TRUST_LEVEL_GROUP_NAMES = {
+    'new': 'Новые',
+    'trusted': 'Доверенные',
+    'suspicious': 'Подозрительные'
+}
+TRUST_STATS_HEADER = "📊 Статистика системы доверия:\n\n    👥 Пользователи по уровням доверия:"
+
+# Названия статусов обжалований
+APPEAL_STATUS_NAMES = {"pending": "Ожидает", "approved": "Принято", "rejected": "Отклонено"}
+
+# Цветные стили кнопок: (имя стиля, цвет фона)
+BUTTON_STYLES = (
+    ('Success.TButton', '#28a745'),
+    ('Danger.TButton', '#dc3545'),
+    ('Warning.TButton', '#ffc107'),
+    ('Info.TButton', '#17a2b8'),
+)
+
+# Сколько ждать остановки бота при закрытии окна (мс)
+BOT_STOP_TIMEOUT_MS = 5000
+
+# Предельное время проверки подключения к OpenAI (секунды)
+CONNECTION_TEST_TIMEOUT = 10
+
+# Сколько показывается уведомление в статусной строке (мс)
+TOAST_MS = 3000
+
+# Нарушений пользователя, подгружаемых в таблицу за раз
+VIOLATIONS_PAGE_SIZE = 50
+
+# Время жизни кэша статистики из БД (секунды)
+STATS_CACHE_TTL = 5
+
+def _ttl_cache(seconds: float):
+    """Кэширует результат функции по аргументам на заданное число секунд"""
+    def decorator(func):
+        cache = {}
+        
+        @wraps(func)
+        def wrapper(*args):
+            now = time.monotonic()
+            hit = cache.get(args)
+            if hit is not None and now - hit[0] < seconds:
+                return hit[1]
+            value = func(*args)
+            cache[args] = (now, value)
+            return value
+        
+        wrapper.cache_clear = cache.clear
+        return wrapper
+    return decorator
+
+@_ttl_cache(STATS_CACHE_TTL)
+def _get_trust_statistics() -> Dict[str, Any]:
+    """Статистика системы доверия с коротким кэшем"""
+    return get_db().get_trust_statistics()
+
+@_ttl_cache(STATS_CACHE_TTL)
+def _get_statistics() -> Dict[str, Any]:
+    """Общая статистика БД с коротким кэшем (нужна и вкладке пользователей, и вкладке доверия)"""
+    return get_db().get_statistics()
+
+# Период единого таймера интерфейса (мс): часы и проверка срока опроса статуса
+UI_TICK_MS = 1000
+UI_HIDDEN_TICK_MS = 5000   # пока окно свернуто
+
+# Интервалы опроса статуса бота (мс)
+STATUS_POLL_ACTIVE_MS = 1000       # бот работает, открыта вкладка мониторинга
+STATUS_POLL_BACKGROUND_MS = 5000   # окно свернуто или открыта другая вкладка
+STATUS_POLL_STOPPED_MS = 10000     # бот остановлен, счетчики не меняются
+
+# Вкладка логов хранит и показывает только хвост файла
+LOG_BUFFER_LINES = 5000
+LOG_TAIL_BYTES = 512 * 1024
+# Размер буфера при копировании файла логов в экспорт
+LOG_EXPORT_CHUNK = 1024 * 1024
+
+# Уровни логов для фильтра: сравниваются числа, а не строки
+LOG_LEVELS = {
+    'DEBUG': logging.DEBUG,
+    'INFO': logging.INFO,
+    'WARNING': logging.WARNING,
+    'ERROR': logging.ERROR,
+    'CRITICAL': logging.CRITICAL,
+}
+# Уровень записи в формате '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+_LOG_LEVEL_RE = re.compile(r'\S+ \S+ - \S+ - (DEBUG|INFO|WARNING|ERROR|CRITICAL) - ')
+
+# Задержка фильтрации списка слов после последнего нажатия клавиши (мс)
+SEARCH_DEBOUNCE_MS = 150
+
+def _short_datetime(value: datetime) -> str:
+    """Дата для таблиц в виде 'дд.мм чч:мм' (то же, что strftime('%d.%m %H:%M'), но без strftime)"""
+    return f"{value.day:02d}.{value.month:02d} {value.hour:02d}:{value.minute:02d}"
+
+@lru_cache(maxsize=1)
+def _sorted_banned_words(version: int) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """Список запрещенных слов, отсортированный без учета регистра, и он же в нижнем регистре"""
+    # lower() вызывается один раз на слово: пары сортируются по нижнему регистру
+    pairs = sorted((word.lower(), word) for word in BANNED_WORDS)
+    return tuple(word for _, word in pairs), tuple(word_lower for word_lower, _ in pairs)
+
+@lru_cache(maxsize=128)
+def _filter_banned_words(search_term: str, version: int) -> Tuple[str, ...]:
+    """
+    Слова, подходящие под search_term (в нижнем регистре)
+    
+    "^префикс" ищет по началу слова двоичным поиском по отсортированному
+    списку, иначе ищется подстрока.
+    """
+    words, words_lower = _sorted_banned_words(version)
+    if not search_term:
+        return words
+    if search_term.startswith("^"):
+        prefix = search_term[1:]
+        lo = bisect_left(words_lower, prefix)
+        hi = bisect_left(words_lower, prefix + "\uffff", lo)
+        return words[lo:hi]
+    return _match_banned_words(search_term, version)[0]
+
+# LRU-кэш поиска по подстроке: (запрос, версия списка) -> (слова, они же в нижнем регистре)
+_MATCH_CACHE_SIZE = 128
+_match_cache: "OrderedDict[Tuple[str, int], Tuple[Tuple[str, ...], Tuple[str, ...]]]" = OrderedDict()
+
+def _match_banned_words(search_term: str, version: int) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """Слова, содержащие подстроку search_term, и они же в нижнем регистре"""
+    cached = _match_cache.get((search_term, version))
+    if cached is not None:
+        _match_cache.move_to_end((search_term, version))
+        return cached
+    
+    # Слово с подстрокой "абв" содержит и "аб": при наборе по буквам сужаем
+    # результат самого длинного уже закэшированного префикса запроса
+    for end in range(len(search_term) - 1, 0, -1):
+        base = _match_cache.get((search_term[:end], version))
+        if base is not None:
+            words, words_lower = base
+            break
+    else:
+        words, words_lower = _sorted_banned_words(version)
+    
+    matched = [i for i, word_lower in enumerate(words_lower) if search_term in word_lower]
+    result = tuple(words[i] for i in matched), tuple(words_lower[i] for i in matched)
+    
+    _match_cache[(search_term, version)] = result
+    if len(_match_cache) > _MATCH_CACHE_SIZE:
+        _match_cache.popitem(last=False)
+    return result
+
 class ModerationGUI:
     """Главный класс графического интерфейса"""
     
@@ -30,9 +230,38 @@ class ModerationGUI:
         
         # Переменные для контроля бота
         self.bot_running = False
-        self.bot_thread = None
         self.status_update_running = False
         
+        # Последний текст периодически обновляемых меток (по id виджета)
+        self._label_cache: Dict[int, str] = {}
+        self._next_status_at = 0.0
+        self._tick_after_id = None
+        self._window_visible = True
+        self._clock_minute = None
+        self._clock_prefix = ""
+        
+        # Постоянный цикл событий в отдельном потоке: все корутины бота
+        # (запуск, остановка) выполняются в нем и живут между действиями
+        self._bot_loop = asyncio.new_event_loop()
+        self.bot_thread = threading.Thread(target=self._bot_loop.run_forever, name="bot-loop", daemon=True)
+        self.bot_thread.start()
+        self._closing = False
+        self._shut_down = False
+        self._bot_stopping = False
+        
+        # Запросы к БД из интерфейса выполняются в пуле, результат
+        # отрисовывается в потоке Tk - окно не замирает на больших базах
+        self._db_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="gui-db")
+        
+        # Отложенные обновления интерфейса по назначению: key -> (функция, аргументы)
+        self._pending_posts: Dict[str, Tuple] = {}
+        self._pending_lock = threading.Lock()
+        
+        # Сортировка списка запрещенных слов - в фоне, пока строится окно,
+        # чтобы первое открытие вкладки не сортировало его в потоке Tk
+        threading.Thread(target=lambda: _sorted_banned_words(get_banned_words_version()),
+                         name="banned-words-sort", daemon=True).start()
+        
         # Настройка стилей
         self.setup_styles()
         
@@ -49,18 +278,31 @@ class ModerationGUI:
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
     
     def setup_styles(self):
-        """Настройка стилей интерфейса"""
-        style = ttk.Style()
-        style.theme_use('clam')
+        """Настройка стилей интерфейса (один раз на окно)"""
+        if getattr(self, '_style', None) is not None:
+            return
+        
+        style = ttk.Style(self.root)
+        # Смена темы перестилизует все виджеты - переключаем, только если нужно
+        if style.theme_use() != 'clam':
+            style.theme_use('clam')
         
         # Стили для кнопок
-        style.configure('Success.TButton', foreground='white', background='#28a745')
-        style.configure('Danger.TButton', foreground='white', background='#dc3545')
-        style.configure('Warning.TButton', foreground='white', background='#ffc107')
-        style.configure('Info.TButton', foreground='white', background='#17a2b8')
+        for name, background in BUTTON_STYLES:
+            style.configure(name, foreground='white', background=background)
+        
+        # Таблицы с моноширинным шрифтом и фиксированной высотой строки
+        fixed_font = tkfont.nametofont("TkFixedFont")
+        style.configure('Mono.Treeview', font=fixed_font, rowheight=fixed_font.metrics('linespace') + 4)
+        
+        # Общий экземпляр стиля для всех вкладок
+        self._style = style
     
     def create_widgets(self):
         """Создание виджетов интерфейса"""
+        # Снимок конфигурации: вкладки читают значения из словаря, а не из bot_config
+        self._cfg = {key: getattr(bot_config, key) for key in CONFIG_SNAPSHOT_KEYS}
+        
         # Главное меню
         self.create_menubar()
         
@@ -131,82 +373,82 @@ class ModerationGUI:
         self.notebook = ttk.Notebook(self.root)
         self.notebook.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         
-        # Вкладки
-        self.create_settings_tab()
-        self.create_monitoring_tab()
-        self.create_users_tab()
-        self.create_trust_tab()
-        self.create_banned_words_tab()
-        self.create_logs_tab()
+        # Вкладки создаются пустыми, содержимое строится при первом открытии
+        self._tab_builders = {}
+        self._built_tabs = set()
+        for index, (text, builder) in enumerate((
+            ("⚙️ Настройки", self.create_settings_tab),
+            ("📊 Мониторинг", self.create_monitoring_tab),
+            ("👥 Пользователи", self.create_users_tab),
+            ("🔒 Система доверия", self.create_trust_tab),
+            ("🚫 Запрещенные слова", self.create_banned_words_tab),
+            ("📋 Логи", self.create_logs_tab),
+        )):
+            frame = ttk.Frame(self.notebook)
+            self.notebook.add(frame, text=text)
+            self._tab_builders[index] = (frame, builder)
+            if builder == self.create_monitoring_tab:
+                self._monitoring_tab_index = index
+            elif builder == self.create_logs_tab:
+                self._logs_tab_index = index
+        
+        self.notebook.bind('<<NotebookTabChanged>>', self._on_tab_changed)
+        # Вкладку настроек строим сразу: она открыта при старте и нужна save_settings
+        self._on_tab_changed()
+    
+    def _on_tab_changed(self, event=None):
+        """Построить содержимое вкладки при первом переходе на нее"""
+        index = self.notebook.index('current')
+        if index not in self._built_tabs:
+            self._built_tabs.add(index)
+            frame, builder = self._tab_builders[index]
+            builder(frame)
+        
+        # На мониторинге счетчики должны быть свежими сразу, а не через интервал опроса
+        if index == self._monitoring_tab_index:
+            self._kick_status_updates()
     
-    def create_settings_tab(self):
+    def create_settings_tab(self, settings_frame):
         """Вкладка настроек"""
-        settings_frame = ttk.Frame(self.notebook)
-        self.notebook.add(settings_frame, text="⚙️ Настройки")
 
         # Создание областей с прокруткой
-        canvas = tk.Canvas(settings_frame)
-        scrollbar = ttk.Scrollbar(settings_frame, orient="vertical", command=canvas.yview)
-        scrollable_frame = ttk.Frame(canvas)
+        canvas, scrollbar, scrollable_frame = self._create_scrollable_area(settings_frame)
 
-        scrollable_frame.bind(
-            "<Configure>",
-            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
-        )
-
-        # ДОБАВЛЕНО: Сохраняем ID окна на канвасе для изменения его ширины
-        self.settings_canvas_window_id = canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
-
-        # ДОБАВЛЕНО: Функция для обновления ширины scrollable_frame при изменении размера canvas
-        def _configure_scrollable_frame_width(event):
-            canvas.itemconfig(self.settings_canvas_window_id, width=event.width)
-        canvas.bind("<Configure>", _configure_scrollable_frame_width)
+        # Группы упаковываются после заполнения, чтобы геометрия пересчитывалась один раз
 
         # Telegram настройки
         telegram_group = ttk.LabelFrame(scrollable_frame, text="Настройки Telegram", padding=10)
-        telegram_group.pack(fill=tk.X, padx=5, pady=5)
 
-        ttk.Label(telegram_group, text="Bot Token:").grid(row=0, column=0, sticky=tk.W, pady=2)
-        self.bot_token_var = tk.StringVar(value=bot_config.BOT_TOKEN)
-        # ИЗМЕНЕНО: убран width, sticky=tk.EW для растягивания
-        ttk.Entry(telegram_group, textvariable=self.bot_token_var, show="*").grid(row=0, column=1, sticky=tk.EW, padx=5)
+        self.bot_token_var = tk.StringVar(value=self._cfg['BOT_TOKEN'])
+        self._add_row(telegram_group, 0, "Bot Token:", self.bot_token_var, show="*")
 
-        ttk.Label(telegram_group, text="ID чата:").grid(row=1, column=0, sticky=tk.W, pady=2)
-        self.chat_id_var = tk.StringVar(value=bot_config.CHAT_ID)
-        # ИЗМЕНЕНО: убран width, sticky=tk.EW для растягивания
-        ttk.Entry(telegram_group, textvariable=self.chat_id_var).grid(row=1, column=1, sticky=tk.EW, padx=5)
+        self.chat_id_var = tk.StringVar(value=self._cfg['CHAT_ID'])
+        self._add_row(telegram_group, 1, "ID чата:", self.chat_id_var)
 
-        ttk.Label(telegram_group, text="ID админ чата:").grid(row=2, column=0, sticky=tk.W, pady=2)
-        self.admin_chat_id_var = tk.StringVar(value=bot_config.ADMIN_CHAT_ID)
-        # ИЗМЕНЕНО: убран width, sticky=tk.EW для растягивания
-        ttk.Entry(telegram_group, textvariable=self.admin_chat_id_var).grid(row=2, column=1, sticky=tk.EW, padx=5)
+        self.admin_chat_id_var = tk.StringVar(value=self._cfg['ADMIN_CHAT_ID'])
+        self._add_row(telegram_group, 2, "ID админ чата:", self.admin_chat_id_var)
         
         # ДОБАВЛЕНО: Настройка растяжения колонки для полей ввода
         telegram_group.columnconfigure(1, weight=1)
+        telegram_group.pack(fill=tk.X, padx=5, pady=5)
 
         # OpenAI настройки
         openai_group = ttk.LabelFrame(scrollable_frame, text="Настройки OpenAI", padding=10)
-        openai_group.pack(fill=tk.X, padx=5, pady=5)
 
-        ttk.Label(openai_group, text="API Key:").grid(row=0, column=0, sticky=tk.W, pady=2)
-        self.openai_key_var = tk.StringVar(value=bot_config.OPENAI_API_KEY)
-        # ИЗМЕНЕНО: убран width, sticky=tk.EW для растягивания
-        ttk.Entry(openai_group, textvariable=self.openai_key_var, show="*").grid(row=0, column=1, sticky=tk.EW, padx=5)
+        self.openai_key_var = tk.StringVar(value=self._cfg['OPENAI_API_KEY'])
+        self._add_row(openai_group, 0, "API Key:", self.openai_key_var, show="*")
 
-        ttk.Label(openai_group, text="Модель:").grid(row=1, column=0, sticky=tk.W, pady=2)
-        self.openai_model_var = tk.StringVar(value=bot_config.OPENAI_MODEL)
+        self.openai_model_var = tk.StringVar(value=self._cfg['OPENAI_MODEL'])
         # ИЗМЕНЕНО: Добавлена модель "gpt-4o"
-        model_combo = ttk.Combobox(openai_group, textvariable=self.openai_model_var,
-                                  values=["gpt-3.5-turbo", "gpt-4", "gpt-4-turbo", "gpt-4o"]) # ИЗМЕНЕНО
-        model_combo.grid(row=1, column=1, sticky=tk.EW, padx=5) # ИЗМЕНЕНО: sticky=tk.EW
+        self._add_row(openai_group, 1, "Модель:", self.openai_model_var,
+                      combobox_values=["gpt-3.5-turbo", "gpt-4", "gpt-4-turbo", "gpt-4o"])
 
-        self.use_openai_var = tk.BooleanVar(value=bot_config.USE_OPENAI_ANALYSIS)
+        self.use_openai_var = tk.BooleanVar(value=self._cfg['USE_OPENAI_ANALYSIS'])
         ttk.Checkbutton(openai_group, text="Использовать анализ OpenAI",
                        variable=self.use_openai_var).grid(row=2, column=0, columnspan=2, sticky=tk.W, pady=5)
 
         ttk.Label(openai_group, text="Порог уверенности:").grid(row=3, column=0, sticky=tk.W, pady=2)
-        self.openai_threshold_var = tk.DoubleVar(value=bot_config.OPENAI_ANALYSIS_THRESHOLD)
+        self.openai_threshold_var = tk.DoubleVar(value=self._cfg['OPENAI_ANALYSIS_THRESHOLD'])
         # Для Scale виджета, sticky=tk.EW также поможет ему занять доступное место, если это нужно
         ttk.Scale(openai_group, from_=0.0, to=1.0, variable=self.openai_threshold_var,
                  orient=tk.HORIZONTAL, length=200).grid(row=3, column=1, sticky=tk.EW, padx=5) # ИЗМЕНЕНО: sticky=tk.EW
@@ -223,32 +465,30 @@ class ModerationGUI:
 
         # ДОБАВЛЕНО: Настройка растяжения колонки для полей ввода и комбобокса
         openai_group.columnconfigure(1, weight=1)
+        openai_group.pack(fill=tk.X, padx=5, pady=5)
 
         # Настройки модерации
         moderation_group = ttk.LabelFrame(scrollable_frame, text="Настройки модерации", padding=10)
-        moderation_group.pack(fill=tk.X, padx=5, pady=5)
 
-        self.auto_delete_var = tk.BooleanVar(value=bot_config.AUTO_DELETE_BANNED_WORDS)
+        self.auto_delete_var = tk.BooleanVar(value=self._cfg['AUTO_DELETE_BANNED_WORDS'])
         ttk.Checkbutton(moderation_group, text="Автоудаление запрещенных слов",
                        variable=self.auto_delete_var).grid(row=0, column=0, columnspan=2, sticky=tk.W, pady=2)
 
-        self.auto_ban_var = tk.BooleanVar(value=bot_config.AUTO_BAN_ON_BANNED_WORDS)
+        self.auto_ban_var = tk.BooleanVar(value=self._cfg['AUTO_BAN_ON_BANNED_WORDS'])
         ttk.Checkbutton(moderation_group, text="Автобан за запрещенные слова",
                        variable=self.auto_ban_var).grid(row=1, column=0, columnspan=2, sticky=tk.W, pady=2)
 
-        ttk.Label(moderation_group, text="Длительность бана (минуты):").grid(row=2, column=0, sticky=tk.W, pady=2)
-        self.ban_duration_var = tk.IntVar(value=bot_config.BAN_DURATION_MINUTES)
-        # Spinbox обычно имеет фиксированную ширину, но если нужно растягивать, можно использовать sticky=tk.EW
-        ttk.Spinbox(moderation_group, from_=1, to=10080, textvariable=self.ban_duration_var,
-                   width=10).grid(row=2, column=1, sticky=tk.W, padx=5) # Оставляем sticky=tk.W для Spinbox если не нужен сильный stretch
+        self.ban_duration_var = tk.IntVar(value=self._cfg['BAN_DURATION_MINUTES'])
+        self._add_row(moderation_group, 2, "Длительность бана (минуты):", self.ban_duration_var,
+                      spinbox_range=(1, 10080))
 
-        ttk.Label(moderation_group, text="Лимит предупреждений:").grid(row=3, column=0, sticky=tk.W, pady=2)
-        self.warning_threshold_var = tk.IntVar(value=bot_config.WARNING_THRESHOLD)
-        ttk.Spinbox(moderation_group, from_=1, to=10, textvariable=self.warning_threshold_var,
-                   width=10).grid(row=3, column=1, sticky=tk.W, padx=5) # Оставляем sticky=tk.W для Spinbox
+        self.warning_threshold_var = tk.IntVar(value=self._cfg['WARNING_THRESHOLD'])
+        self._add_row(moderation_group, 3, "Лимит предупреждений:", self.warning_threshold_var,
+                      spinbox_range=(1, 10))
 
         # ДОБАВЛЕНО: Настройка растяжения колонки для Spinbox, если необходимо (пока вес 0, т.е. не растягивается сильно)
         moderation_group.columnconfigure(1, weight=0) # Можно поставить weight=1 если нужно растягивать Spinbox
+        moderation_group.pack(fill=tk.X, padx=5, pady=5)
 
         # Кнопки
         buttons_frame = ttk.Frame(scrollable_frame)
@@ -258,17 +498,81 @@ class ModerationGUI:
                   command=self.save_settings).pack(side=tk.LEFT, padx=5)
         ttk.Button(buttons_frame, text="Сбросить",
                   command=self.reset_settings).pack(side=tk.LEFT, padx=5)
-        ttk.Button(buttons_frame, text="Тест подключений",
-                  command=self.test_connections, style='Info.TButton').pack(side=tk.RIGHT, padx=5)
+        self.test_btn = ttk.Button(buttons_frame, text="Тест подключений",
+                                   command=self.test_connections, style='Info.TButton')
+        self.test_btn.pack(side=tk.RIGHT, padx=5)
 
         # Упаковка прокрутки
         canvas.pack(side="left", fill="both", expand=True)
         scrollbar.pack(side="right", fill="y")
     
-    def create_monitoring_tab(self):
+    def _create_scrollable_area(self, parent):
+        """
+        Создать канвас с прокручиваемой рамкой внутри
+        
+        Содержимое вкладок фиксировано, поэтому высота прокрутки считается
+        один раз при первом показе (<Map>). Изменения размера канваса сводятся
+        в один отложенный пересчет, а ширина окна и scrollregion меняются,
+        только если действительно изменились.
+        """
+        canvas = tk.Canvas(parent)
+        scrollbar = ttk.Scrollbar(parent, orient="vertical", command=canvas.yview)
+        scrollable_frame = ttk.Frame(canvas)
+        window_id = canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
+        canvas.configure(yscrollcommand=scrollbar.set)
+        
+        state = {'width': None, 'req_height': None, 'pending': None}
+        
+        def _apply_geometry():
+            state['pending'] = None
+            width = canvas.winfo_width()
+            if width != state['width']:
+                state['width'] = width
+                canvas.itemconfig(window_id, width=width)
+            req_height = scrollable_frame.winfo_reqheight()
+            if req_height != state['req_height']:
+                state['req_height'] = req_height
+                canvas.configure(scrollregion=(0, 0, 0, req_height))
+        
+        def _on_configure(event):
+            if state['pending'] is None:
+                state['pending'] = canvas.after_idle(_apply_geometry)
+        
+        def _on_first_map(event):
+            canvas.unbind("<Map>", map_binding)
+            _on_configure(event)
+        
+        canvas.bind("<Configure>", _on_configure, add='+')
+        map_binding = canvas.bind("<Map>", _on_first_map, add='+')
+        return canvas, scrollbar, scrollable_frame
+    
+    def _add_row(self, parent, row: int, label: str, var: tk.Variable, *, show: str = None,
+                 combobox_values: list = None, spinbox_range: Tuple[int, int] = None):
+        """
+        Добавить в сетку строку "метка + поле ввода"
+        
+        По умолчанию создается растягиваемый Entry; combobox_values дает Combobox,
+        spinbox_range - Spinbox фиксированной ширины.
+        """
+        ttk.Label(parent, text=label).grid(row=row, column=0, sticky=tk.W, pady=2)
+        
+        if spinbox_range is not None:
+            widget = ttk.Spinbox(parent, from_=spinbox_range[0], to=spinbox_range[1],
+                                 textvariable=var, width=10)
+            widget.grid(row=row, column=1, sticky=tk.W, padx=5)
+            return widget
+        
+        if combobox_values is not None:
+            widget = ttk.Combobox(parent, textvariable=var, values=combobox_values)
+        elif show:
+            widget = ttk.Entry(parent, textvariable=var, show=show)
+        else:
+            widget = ttk.Entry(parent, textvariable=var)
+        widget.grid(row=row, column=1, sticky=tk.EW, padx=5)
+        return widget
+    
+    def create_monitoring_tab(self, monitoring_frame):
         """Вкладка мониторинга"""
-        monitoring_frame = ttk.Frame(self.notebook)
-        self.notebook.add(monitoring_frame, text="📊 Мониторинг")
         
         # Статистика в реальном времени
         stats_group = ttk.LabelFrame(monitoring_frame, text="Статистика в реальном времени", padding=10)
@@ -316,10 +620,8 @@ class ModerationGUI:
         ttk.Button(update_frame, text="Очистить истекшие баны", 
                   command=self.cleanup_bans).pack(side=tk.LEFT, padx=5)
     
-    def create_users_tab(self):
+    def create_users_tab(self, users_frame):
         """Вкладка управления пользователями"""
-        users_frame = ttk.Frame(self.notebook)
-        self.notebook.add(users_frame, text="👥 Пользователи")
         
         # Поиск пользователя
         search_frame = ttk.LabelFrame(users_frame, text="Поиск пользователя", padding=10)
@@ -374,22 +676,35 @@ class ModerationGUI:
         
         # Таблица нарушений
         columns = ('Дата', 'Тип', 'Действие', 'AI Уверенность')
-        self.violations_tree = ttk.Treeview(violations_frame, columns=columns, show='headings', height=8)
+        self.violations_tree = ttk.Treeview(violations_frame, columns=columns, show='headings', height=8,
+                                            style='Mono.Treeview')
         
         for col in columns:
             self.violations_tree.heading(col, text=col)
             self.violations_tree.column(col, width=150)
         
         violations_scrollbar = ttk.Scrollbar(violations_frame, orient=tk.VERTICAL, command=self.violations_tree.yview)
-        self.violations_tree.configure(yscrollcommand=violations_scrollbar.set)
+        
+        # Таблица заполняется страницами: следующая подгружается при прокрутке к концу
+        self._violations_user = None
+        self._searched_user_id = None
+        self._violations_offset = 0
+        self._violations_exhausted = True
+        self._violations_loading = False
+        
+        def _on_violations_scroll(first, last):
+            violations_scrollbar.set(first, last)
+            if float(last) > 0.95 and not self._violations_exhausted and not self._violations_loading:
+                self._violations_loading = True
+                self.root.after_idle(self._load_more_violations)
+        
+        self.violations_tree.configure(yscrollcommand=_on_violations_scroll)
         
         self.violations_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         violations_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
     
-    def create_banned_words_tab(self):
+    def create_banned_words_tab(self, words_frame):
         """Вкладка управления запрещенными словами"""
-        words_frame = ttk.Frame(self.notebook)
-        self.notebook.add(words_frame, text="🚫 Запрещенные слова")
         
         # Добавление слов
         add_frame = ttk.LabelFrame(words_frame, text="Добавить слово", padding=10)
@@ -410,19 +725,36 @@ class ModerationGUI:
         
         ttk.Label(search_words_frame, text="Поиск:").pack(side=tk.LEFT, padx=5)
         self.search_words_var = tk.StringVar()
-        self.search_words_var.trace('w', self.filter_banned_words)
-        ttk.Entry(search_words_frame, textvariable=self.search_words_var, width=30).pack(side=tk.LEFT, padx=5)
-        
-        # Список с прокруткой
+        self._search_after_id = None
+        self.search_words_var.trace_add('write', self._on_search_changed)
+        search_entry = ttk.Entry(search_words_frame, textvariable=self.search_words_var, width=30)
+        search_entry.pack(side=tk.LEFT, padx=5)
+        # Enter применяет фильтр сразу, не дожидаясь паузы
+        search_entry.bind('<Return>', self.filter_banned_words)
+        
+        # Виртуальный список: на канвасе рисуются только видимые строки
         words_list_frame = ttk.Frame(list_frame)
         words_list_frame.pack(fill=tk.BOTH, expand=True)
         
-        self.words_listbox = tk.Listbox(words_list_frame, selectmode=tk.SINGLE)
-        words_listbox_scroll = ttk.Scrollbar(words_list_frame, orient=tk.VERTICAL, command=self.words_listbox.yview)
-        self.words_listbox.configure(yscrollcommand=words_listbox_scroll.set)
+        self._filtered_words = ()
+        self._selected_word = None
+        # Моноширинный шрифт: высота строки одна и та же и считается один раз
+        self._words_font = tkfont.nametofont("TkFixedFont")
+        # Высота строки равна межстрочному интервалу: видимые слова рисуются одним текстом
+        self._words_row_h = self._words_font.metrics("linespace")
+        
+        self.words_canvas = tk.Canvas(words_list_frame, background="white", highlightthickness=0)
+        words_canvas_scroll = ttk.Scrollbar(words_list_frame, orient=tk.VERTICAL, command=self._scroll_words)
+        self.words_canvas.configure(yscrollcommand=words_canvas_scroll.set)
         
-        self.words_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        words_listbox_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        self.words_canvas.bind("<Configure>", lambda e: self._render_words_viewport())
+        self.words_canvas.bind("<Button-1>", self._on_words_click)
+        self.words_canvas.bind("<MouseWheel>", lambda e: self._scroll_words("scroll", -e.delta // 120, "units"))
+        self.words_canvas.bind("<Button-4>", lambda e: self._scroll_words("scroll", -1, "units"))
+        self.words_canvas.bind("<Button-5>", lambda e: self._scroll_words("scroll", 1, "units"))
+        
+        self.words_canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        words_canvas_scroll.pack(side=tk.RIGHT, fill=tk.Y)
         
         # Кнопки управления
         words_buttons_frame = ttk.Frame(list_frame)
@@ -438,10 +770,8 @@ class ModerationGUI:
         # Загружаем список слов
         self.load_banned_words()
     
-    def create_logs_tab(self):
+    def create_logs_tab(self, logs_frame):
         """Вкладка логов"""
-        logs_frame = ttk.Frame(self.notebook)
-        self.notebook.add(logs_frame, text="📋 Логи")
         
         # Фильтры логов
         filters_frame = ttk.LabelFrame(logs_frame, text="Фильтры", padding=10)
@@ -452,12 +782,16 @@ class ModerationGUI:
         log_level_combo = ttk.Combobox(filters_frame, textvariable=self.log_level_var, 
                                       values=["DEBUG", "INFO", "WARNING", "ERROR"], width=10)
         log_level_combo.pack(side=tk.LEFT, padx=5)
+        log_level_combo.bind('<<ComboboxSelected>>', lambda e: self.load_logs())
         
         ttk.Button(filters_frame, text="Обновить", command=self.load_logs).pack(side=tk.LEFT, padx=10)
         ttk.Button(filters_frame, text="Очистить", command=self.clear_logs).pack(side=tk.LEFT, padx=5)
         ttk.Button(filters_frame, text="Экспорт", command=self.export_logs).pack(side=tk.RIGHT, padx=5)
         
-        # Область логов
+        # Область логов: показывает кольцевой буфер последних строк, а не весь файл
+        self._log_buffer = deque(maxlen=LOG_BUFFER_LINES)
+        self._log_pos = 0  # до какого байта файл логов уже прочитан
+        self._logs_stale = False  # виджет отстал от буфера
         self.logs_text = scrolledtext.ScrolledText(logs_frame, wrap=tk.WORD, height=25)
         self.logs_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         
@@ -469,69 +803,48 @@ class ModerationGUI:
         # Загружаем логи
         self.load_logs()
 
-    def create_trust_tab(self):
+    def create_trust_tab(self, trust_frame):
         """Вкладка системы доверия"""
-        trust_frame = ttk.Frame(self.notebook)
-        self.notebook.add(trust_frame, text="🔒 Система доверия")
 
         # Создание областей с прокруткой
-        trust_canvas = tk.Canvas(trust_frame)
-        trust_scrollbar = ttk.Scrollbar(trust_frame, orient="vertical", command=trust_canvas.yview)
-        trust_scrollable_frame = ttk.Frame(trust_canvas)
-
-        trust_scrollable_frame.bind(
-            "<Configure>",
-            lambda e: trust_canvas.configure(scrollregion=trust_canvas.bbox("all"))
-        )
-
-        # ДОБАВЛЕНО: Сохраняем ID окна на канвасе для изменения его ширины
-        self.trust_canvas_window_id = trust_canvas.create_window((0, 0), window=trust_scrollable_frame, anchor="nw")
-        trust_canvas.configure(yscrollcommand=trust_scrollbar.set)
-
-        # ДОБАВЛЕНО: Функция для обновления ширины trust_scrollable_frame при изменении размера trust_canvas
-        def _configure_trust_scrollable_frame_width(event):
-            trust_canvas.itemconfig(self.trust_canvas_window_id, width=event.width)
-        trust_canvas.bind("<Configure>", _configure_trust_scrollable_frame_width)
-
+        trust_canvas, trust_scrollbar, trust_scrollable_frame = self._create_scrollable_area(trust_frame)
 
         # Включение системы доверия
         enable_group = ttk.LabelFrame(trust_scrollable_frame, text="Основные настройки", padding=10)
         enable_group.pack(fill=tk.X, padx=5, pady=5)
 
-        self.trust_enabled_var = tk.BooleanVar(value=bot_config.TRUST_SYSTEM_ENABLED)
+        self.trust_enabled_var = tk.BooleanVar(value=self._cfg['TRUST_SYSTEM_ENABLED'])
         ttk.Checkbutton(enable_group, text="Включить систему доверия",
                     variable=self.trust_enabled_var).pack(anchor=tk.W, pady=2)
 
-        self.link_detection_var = tk.BooleanVar(value=bot_config.LINK_DETECTION_ENABLED)
+        self.link_detection_var = tk.BooleanVar(value=self._cfg['LINK_DETECTION_ENABLED'])
         ttk.Checkbutton(enable_group, text="Включить детекцию ссылок",
                     variable=self.link_detection_var).pack(anchor=tk.W, pady=2)
 
         # Пороги доверия
         thresholds_group = ttk.LabelFrame(trust_scrollable_frame, text="Пороги доверия", padding=10)
-        thresholds_group.pack(fill=tk.X, padx=5, pady=5)
         # ИЗМЕНЕНО: weight=0, так как Spinbox имеет фиксированную ширину и мы его не растягиваем, а колонка с метками (0) может занимать остальное место
         thresholds_group.columnconfigure(0, weight=1) # Метки могут занимать больше места, если нужно
         thresholds_group.columnconfigure(1, weight=0) # Spinbox-ы не будут сильно растягиваться
 
-        ttk.Label(thresholds_group, text="Дней в чате для доверия:").grid(row=0, column=0, sticky=tk.W, pady=2)
-        self.trust_days_var = tk.IntVar(value=bot_config.TRUST_DAYS_THRESHOLD)
-        ttk.Spinbox(thresholds_group, from_=1, to=30, textvariable=self.trust_days_var,
-                width=10).grid(row=0, column=1, sticky=tk.W, padx=5) # sticky=tk.W для Spinbox
+        self.trust_days_var = tk.IntVar(value=self._cfg['TRUST_DAYS_THRESHOLD'])
+        self._add_row(thresholds_group, 0, "Дней в чате для доверия:", self.trust_days_var,
+                      spinbox_range=(1, 30))
 
-        ttk.Label(thresholds_group, text="Сообщений для доверия:").grid(row=1, column=0, sticky=tk.W, pady=2)
-        self.trust_messages_var = tk.IntVar(value=bot_config.TRUST_MESSAGES_THRESHOLD)
-        ttk.Spinbox(thresholds_group, from_=1, to=100, textvariable=self.trust_messages_var,
-                width=10).grid(row=1, column=1, sticky=tk.W, padx=5) # sticky=tk.W для Spinbox
+        self.trust_messages_var = tk.IntVar(value=self._cfg['TRUST_MESSAGES_THRESHOLD'])
+        self._add_row(thresholds_group, 1, "Сообщений для доверия:", self.trust_messages_var,
+                      spinbox_range=(1, 100))
+        thresholds_group.pack(fill=tk.X, padx=5, pady=5)
 
         # Действия при нарушениях
         actions_group = ttk.LabelFrame(trust_scrollable_frame, text="Действия при нарушениях", padding=10)
         actions_group.pack(fill=tk.X, padx=5, pady=5)
 
-        self.auto_delete_links_var = tk.BooleanVar(value=bot_config.AUTO_DELETE_LINKS_FROM_NEW)
+        self.auto_delete_links_var = tk.BooleanVar(value=self._cfg['AUTO_DELETE_LINKS_FROM_NEW'])
         ttk.Checkbutton(actions_group, text="Автоудаление ссылок от новых пользователей",
                     variable=self.auto_delete_links_var).pack(anchor=tk.W, pady=2)
 
-        self.ban_repeated_links_var = tk.BooleanVar(value=bot_config.BAN_ON_REPEATED_LINK_VIOLATION)
+        self.ban_repeated_links_var = tk.BooleanVar(value=self._cfg['BAN_ON_REPEATED_LINK_VIOLATION'])
         ttk.Checkbutton(actions_group, text="Бан за повторную отправку ссылок",
                     variable=self.ban_repeated_links_var).pack(anchor=tk.W, pady=2)
 
@@ -543,7 +856,7 @@ class ModerationGUI:
 
 
         ttk.Label(domains_group, text="Домены (через запятую):").grid(row=0, column=0, sticky=tk.W, pady=2) # ИЗМЕНЕНО: pack на grid
-        self.trusted_domains_var = tk.StringVar(value=",".join(bot_config.TRUSTED_DOMAINS or []))
+        self.trusted_domains_var = tk.StringVar(value=",".join(self._cfg['TRUSTED_DOMAINS'] or []))
         domains_entry = ttk.Entry(domains_group, textvariable=self.trusted_domains_var)
         domains_entry.grid(row=1, column=0, sticky=tk.EW, pady=2, padx=5) # ИЗМЕНЕНО: pack на grid, sticky=tk.EW
 
@@ -552,6 +865,7 @@ class ModerationGUI:
         stats_group.pack(fill=tk.X, padx=5, pady=5)
 
         self.trust_stats_text = scrolledtext.ScrolledText(stats_group, height=8, wrap=tk.WORD)
+        self._last_trust_stats = None
         self.trust_stats_text.pack(fill=tk.BOTH, expand=True) # Это правильно для ScrolledText
 
         # Кнопки управления
@@ -572,66 +886,63 @@ class ModerationGUI:
         # Загружаем статистику
         self.update_trust_stats()
 
+    def _apply_trust_settings(self):
+        """Перенести значения вкладки системы доверия в bot_config"""
+        for attr, var_name in TRUST_SETTINGS_FIELDS:
+            setattr(bot_config, attr, getattr(self, var_name).get())
+        
+        # Обрабатываем доверенные домены
+        domains = (domain.strip() for domain in self.trusted_domains_var.get().split(","))
+        bot_config.TRUSTED_DOMAINS = [domain for domain in domains if domain]
+    
     def save_trust_settings(self):
         """Сохранение настроек системы доверия"""
         try:
-            # Обновляем конфигурацию
-            bot_config.TRUST_SYSTEM_ENABLED = self.trust_enabled_var.get()
-            bot_config.LINK_DETECTION_ENABLED = self.link_detection_var.get()
-            bot_config.TRUST_DAYS_THRESHOLD = self.trust_days_var.get()
-            bot_config.TRUST_MESSAGES_THRESHOLD = self.trust_messages_var.get()
-            bot_config.AUTO_DELETE_LINKS_FROM_NEW = self.auto_delete_links_var.get()
-            bot_config.BAN_ON_REPEATED_LINK_VIOLATION = self.ban_repeated_links_var.get()
-            
-            # Обрабатываем доверенные домены
-            domains_text = self.trusted_domains_var.get().strip()
-            if domains_text:
-                bot_config.TRUSTED_DOMAINS = [domain.strip() for domain in domains_text.split(",") if domain.strip()]
-            else:
-                bot_config.TRUSTED_DOMAINS = []
+            self._apply_trust_settings()
             
             # Сохраняем в переменные окружения
             save_config_to_env(bot_config)
             
-            self.status_text.set("Настройки системы доверия сохранены")
-            messagebox.showinfo("Успех", "Настройки системы доверия сохранены!")
+            self._toast("Настройки системы доверия сохранены")
             
         except Exception as e:
             messagebox.showerror("Ошибка", f"Не удалось сохранить настройки: {e}")
 
     def update_trust_stats(self):
         """Обновление статистики системы доверия"""
-        try:
-            stats = db.get_trust_statistics()
-            
-            stats_text = f"""📊 Статистика системы доверия:
-
-    👥 Пользователи по уровням доверия:"""
-            
-            trust_levels_names = {
-                'new': 'Новые',
-                'trusted': 'Доверенные', 
-                'suspicious': 'Подозрительные'
-            }
-            
-            for level, count in stats.get('trust_levels', {}).items():
-                level_name = trust_levels_names.get(level, level)
-                stats_text += f"\n   • {level_name}: {count}"
-            
-            stats_text += f"\n\n📈 Средние сообщения у доверенных: {stats.get('avg_trusted_messages', 0)}"
-            
-            # Общая статистика нарушений по ссылкам
-            general_stats = db.get_statistics()
-            violations = general_stats.get('top_violations', [])
-            link_violations = next((count for violation_type, count in violations if violation_type == 'suspicious_links'), 0)
-            
-            stats_text += f"\n\n🔗 Нарушений по ссылкам: {link_violations}"
-            
-            self.trust_stats_text.delete(1.0, tk.END)
-            self.trust_stats_text.insert(tk.END, stats_text)
-            
-        except Exception as e:
-            messagebox.showerror("Ошибка", f"Не удалось обновить статистику: {e}")
+        def query():
+            # Общая статистика нужна ради нарушений по ссылкам
+            return _get_trust_statistics(), _get_statistics()
+        
+        self._submit_db(query, self._show_trust_stats,
+                        lambda e: messagebox.showerror("Ошибка", f"Не удалось обновить статистику: {e}"),
+                        key='trust_stats')
+    
+    def _show_trust_stats(self, result):
+        """Отрисовать статистику системы доверия"""
+        stats, general_stats = result
+        
+        levels_text = "".join(
+            f"\n   • {TRUST_LEVEL_GROUP_NAMES.get(level, level)}: {count}"
+            for level, count in stats.get('trust_levels', {}).items()
+        )
+        
+        violations = general_stats.get('top_violations', [])
+        link_violations = next((count for violation_type, count in violations if violation_type == 'suspicious_links'), 0)
+        
+        stats_text = (
+            f"{TRUST_STATS_HEADER}{levels_text}"
+            f"\n\n📈 Средние сообщения у доверенных: {stats.get('avg_trusted_messages', 0)}"
+            f"\n\n🔗 Нарушений по ссылкам: {link_violations}"
+        )
+        
+        # Текст не изменился - не перерисовываем виджет
+        if stats_text == self._last_trust_stats:
+            return
+        self._last_trust_stats = stats_text
+        
+        self.trust_stats_text.delete(1.0, tk.END)
+        self.trust_stats_text.insert(tk.END, stats_text)
 
     def recalculate_trust_levels(self):
         """Пересчет уровней доверия для всех пользователей"""
@@ -644,9 +955,10 @@ class ModerationGUI:
                     try:
                         # Получаем всех пользователей и пересчитываем их уровни
                         # Этот метод нужно добавить в database.py
-                        count = db.recalculate_all_trust_levels()
-                        self.root.after(0, lambda: messagebox.showinfo("Результат", f"Пересчитано уровней доверия: {count}"))
-                        self.root.after(0, self.update_trust_stats)
+                        count = get_db().recalculate_all_trust_levels()
+                        _get_trust_statistics.cache_clear()
+                        self.root.after(0, self._toast, f"Пересчитано уровней доверия: {count}")
+                        self._post('trust_stats_refresh', self.update_trust_stats)
                     except Exception as e:
                         self.root.after(0, lambda: messagebox.showerror("Ошибка", f"Ошибка пересчета: {e}"))
                 
@@ -663,50 +975,147 @@ class ModerationGUI:
         self.status_text = tk.StringVar(value="Готов к работе")
         ttk.Label(self.statusbar, textvariable=self.status_text).pack(side=tk.LEFT, padx=5)
         
+        # Уведомление в статусной строке и текст, который вернется после него
+        self._toast_after_id = None
+        self._toast_message = None
+        self._toast_restore = ""
+        
         self.time_label = ttk.Label(self.statusbar, text="")
         self.time_label.pack(side=tk.RIGHT, padx=5)
         
         # Обновление времени
         self.update_time()
     
+    def _toast(self, message: str):
+        """Показать уведомление в статусной строке на TOAST_MS (вместо модального окна)"""
+        current = self.status_text.get()
+        if current != self._toast_message:
+            self._toast_restore = current
+        if self._toast_after_id:
+            self.root.after_cancel(self._toast_after_id)
+        
+        self._toast_message = message
+        self.status_text.set(message)
+        self._toast_after_id = self.root.after(TOAST_MS, self._end_toast)
+    
+    def _end_toast(self):
+        """Вернуть статусную строку после уведомления"""
+        self._toast_after_id = None
+        # Если за это время статус сменился (запуск бота и т.п.) - не трогаем его
+        if self.status_text.get() == self._toast_message:
+            self.status_text.set(self._toast_restore)
+        self._toast_message = None
+    
     def update_time(self):
         """Обновление времени в статусной строке"""
-        current_time = datetime.now().strftime("%H:%M:%S")
-        self.time_label.config(text=current_time)
-        self.root.after(1000, self.update_time)
+        now = datetime.now()
+        # strftime только раз в минуту, секунды дописываются к готовому префиксу
+        minute = (now.hour, now.minute)
+        if minute != self._clock_minute:
+            self._clock_minute = minute
+            self._clock_prefix = now.strftime("%H:%M:")
+        self._set_text(self.time_label, f"{self._clock_prefix}{now.second:02d}")
+    
+    def _tick(self):
+        """Единый таймер интерфейса: часы - каждую секунду, статус - по своему интервалу"""
+        if self._window_visible:
+            self.update_time()
+            self.update_status()
+            if self._logs_tab_index in self._built_tabs and self.notebook.index('current') == self._logs_tab_index:
+                self._poll_logs()
+            self._tick_after_id = self.root.after(UI_TICK_MS, self._tick)
+        else:
+            # Окно свернуто: ничего не рисуем и просыпаемся реже
+            self._tick_after_id = self.root.after(UI_HIDDEN_TICK_MS, self._tick)
+    
+    def _on_root_visibility(self, event, visible: bool):
+        """Отслеживание сворачивания/разворачивания главного окна"""
+        if event.widget is not self.root or visible == self._window_visible:
+            return
+        self._window_visible = visible
+        
+        # После разворачивания сразу показываем актуальные часы и статус
+        if visible and self._tick_after_id:
+            self.root.after_cancel(self._tick_after_id)
+            self._next_status_at = 0.0
+            self._tick()
+    
+    def _set_text(self, label, text: str):
+        """Изменить текст метки, только если он действительно поменялся"""
+        key = id(label)
+        if self._label_cache.get(key) == text:
+            return
+        self._label_cache[key] = text
+        label.config(text=text)
     
     def start_status_updates(self):
         """Запуск обновления статуса"""
         if not self.status_update_running:
             self.status_update_running = True
-            self.update_status()
+            self.root.bind('<Map>', lambda e: self._on_root_visibility(e, True), add='+')
+            self.root.bind('<Unmap>', lambda e: self._on_root_visibility(e, False), add='+')
+            self._tick()
+    
+    def _kick_status_updates(self):
+        """Обновить статус немедленно и заново выбрать интервал опроса"""
+        self._next_status_at = 0.0
+        self.update_status()
     
     def update_status(self):
+        """Обновить статус, если подошел срок: интервал зависит от состояния бота и окна"""
+        if not self.status_update_running:
+            return
+        
+        now = time.monotonic()
+        if now < self._next_status_at:
+            return
+        
+        iconic = self.root.state() == 'iconic'
+        monitoring_visible = not iconic and self.notebook.index('current') == self._monitoring_tab_index
+        
+        if not self.bot_running:
+            interval = STATUS_POLL_STOPPED_MS
+        elif monitoring_visible:
+            interval = STATUS_POLL_ACTIVE_MS
+        else:
+            interval = STATUS_POLL_BACKGROUND_MS
+        
+        # Свернутое окно не перерисовываем; саму работу отдаем на простой цикла Tk,
+        # чтобы она не задерживала обработку ввода
+        if not iconic:
+            self._post('status', self._refresh_status, monitoring_visible)
+        
+        self._next_status_at = now + interval / 1000
+    
+    def _refresh_status(self, update_monitoring: bool):
         """Обновление статуса интерфейса"""
         if self.status_update_running:
             try:
-                # Обновляем статистику бота
-                if hasattr(bot, 'stats'):
-                    self.messages_count_label.config(text=f"Обработано сообщений: {bot.stats['messages_processed']}")
-                    self.violations_count_label.config(text=f"Нарушений обнаружено: {bot.stats['violations_detected']}")
-                    self.users_banned_label.config(text=f"Пользователей заблокировано: {bot.stats['users_banned']}")
-                    self.users_warned_label.config(text=f"Предупреждений выдано: {bot.stats['users_warned']}")
+                # Один снимок статистики на весь проход
+                stats = getattr(bot, 'stats', None)
+                if stats is None:
+                    return
+                messages = stats['messages_processed']
+                violations = stats['violations_detected']
+                
+                # Обновляем статистику бота (если вкладка мониторинга открыта и построена)
+                if update_monitoring and hasattr(self, 'messages_count_label'):
+                    set_text = self._set_text
+                    set_text(self.messages_count_label, f"Обработано сообщений: {messages}")
+                    set_text(self.violations_count_label, f"Нарушений обнаружено: {violations}")
+                    set_text(self.users_banned_label, f"Пользователей заблокировано: {stats['users_banned']}")
+                    set_text(self.users_warned_label, f"Предупреждений выдано: {stats['users_warned']}")
                     
-                    if bot.stats['bot_started']:
-                        uptime = datetime.now() - bot.stats['bot_started']
-                        uptime_str = str(uptime).split('.')[0]
-                        self.uptime_label.config(text=f"Время работы: {uptime_str}")
+                    started = stats['bot_started']
+                    if started:
+                        uptime_str = str(datetime.now() - started).split('.')[0]
+                        set_text(self.uptime_label, f"Время работы: {uptime_str}")
                 
                 # Обновляем статистику в тулбаре
-                if hasattr(bot, 'stats'):
-                    stats_text = f"Сообщений: {bot.stats['messages_processed']} | Нарушений: {bot.stats['violations_detected']}"
-                    self.stats_label.config(text=stats_text)
+                self._set_text(self.stats_label, f"Сообщений: {messages} | Нарушений: {violations}")
                 
             except Exception as e:
                 print(f"Ошибка обновления статуса: {e}")
-            
-            # Планируем следующее обновление
-            self.root.after(2000, self.update_status)
     
     def start_bot(self):
         """Запуск бота"""
@@ -724,24 +1133,16 @@ class ModerationGUI:
         
         try:
             self.status_text.set("Запуск бота...")
+            # Повторное нажатие до окончания запуска не должно запустить бота второй раз
+            self.start_btn.config(state='disabled')
             
-            # Запускаем бота в отдельном потоке
-            def run_bot():
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                try:
-                    loop.run_until_complete(self.run_bot_async())
-                except Exception as error:
-                    # Исправляем проблему с переменной e
-                    self.root.after(0, lambda err=error: messagebox.showerror("Ошибка", f"Ошибка запуска бота: {err}"))
-                    self.root.after(0, lambda: self.status_text.set("Ошибка запуска"))
-                finally:
-                    loop.close()
-            
-            self.bot_thread = threading.Thread(target=run_bot, daemon=True)
-            self.bot_thread.start()
+            # Запускаем бота в цикле событий фонового потока; цикл не закрывается
+            # после запуска, поэтому polling и фоновые задачи продолжают работать.
+            # Ошибки run_bot_async передает в UI сама
+            asyncio.run_coroutine_threadsafe(self.run_bot_async(), self._bot_loop)
             
         except Exception as error:
+            self.start_btn.config(state='normal')
             messagebox.showerror("Ошибка", f"Не удалось запустить бота: {error}")
             self.status_text.set("Ошибка запуска")
     
@@ -766,6 +1167,7 @@ class ModerationGUI:
         self.stop_btn.config(state='normal')
         self.status_label.config(text="Статус: Запущен", foreground='green')
         self.status_text.set("Бот запущен и работает")
+        self._kick_status_updates()
     
     def on_bot_error(self, error):
         """Обработчик ошибки запуска бота"""
@@ -781,27 +1183,33 @@ class ModerationGUI:
         if not self.bot_running:
             messagebox.showwarning("Предупреждение", "Бот не запущен!")
             return
+        if self._bot_stopping:
+            return  # Остановка уже идет, ее завершение обработает _on_stop_done
         
         try:
             self.status_text.set("Остановка бота...")
+            self.stop_btn.config(state='disabled')
             
-            # Останавливаем бота
-            def stop_bot_async():
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                try:
-                    loop.run_until_complete(bot.stop())
-                except Exception as error:
-                    print(f"Ошибка остановки бота: {error}")
-                finally:
-                    loop.close()
-                    self.root.after(0, self.on_bot_stopped)
-            
-            threading.Thread(target=stop_bot_async, daemon=True).start()
+            # Останавливаем бота в том же цикле, где он был запущен
+            future = asyncio.run_coroutine_threadsafe(bot.stop(), self._bot_loop)
+            self._bot_stopping = True
+            future.add_done_callback(lambda f: self.root.after(0, self._on_stop_done, f))
             
         except Exception as error:
+            self.stop_btn.config(state='normal')
             messagebox.showerror("Ошибка", f"Не удалось остановить бота: {error}")
     
+    def _on_stop_done(self, future):
+        """Завершение остановки бота (вызывается в потоке Tk)"""
+        self._bot_stopping = False
+        error = future.exception()
+        if error:
+            print(f"Ошибка остановки бота: {error}")
+        self.on_bot_stopped()
+        
+        if self._closing:
+            self._shutdown()
+    
     def on_bot_stopped(self):
         """Обработчик остановки бота"""
         self.bot_running = False
@@ -809,47 +1217,25 @@ class ModerationGUI:
         self.stop_btn.config(state='disabled')
         self.status_label.config(text="Статус: Остановлен", foreground='red')
         self.status_text.set("Бот остановлен")
+        self._kick_status_updates()
     
     def save_settings(self):
         """Сохранение настроек"""
         try:
             # Обновляем конфигурацию
-            bot_config.BOT_TOKEN = self.bot_token_var.get().strip()
-            bot_config.CHAT_ID = self.chat_id_var.get().strip()
-            bot_config.ADMIN_CHAT_ID = self.admin_chat_id_var.get().strip()
-            bot_config.OPENAI_API_KEY = self.openai_key_var.get().strip()
-            bot_config.OPENAI_MODEL = self.openai_model_var.get()
-            bot_config.USE_OPENAI_ANALYSIS = self.use_openai_var.get()
-            bot_config.OPENAI_ANALYSIS_THRESHOLD = self.openai_threshold_var.get()
-            bot_config.AUTO_DELETE_BANNED_WORDS = self.auto_delete_var.get()
-            bot_config.AUTO_BAN_ON_BANNED_WORDS = self.auto_ban_var.get()
-            bot_config.BAN_DURATION_MINUTES = self.ban_duration_var.get()
-            bot_config.WARNING_THRESHOLD = self.warning_threshold_var.get()
+            for attr, var_name, _ in SETTINGS_FIELDS:
+                value = getattr(self, var_name).get()
+                setattr(bot_config, attr, value.strip() if isinstance(value, str) else value)
             
             # Настройки системы доверия (если вкладка создана)
             if hasattr(self, 'trust_enabled_var'):
-                bot_config.TRUST_SYSTEM_ENABLED = self.trust_enabled_var.get()
-                bot_config.LINK_DETECTION_ENABLED = self.link_detection_var.get()
-                bot_config.TRUST_DAYS_THRESHOLD = self.trust_days_var.get()
-                bot_config.TRUST_MESSAGES_THRESHOLD = self.trust_messages_var.get()
-                bot_config.AUTO_DELETE_LINKS_FROM_NEW = self.auto_delete_links_var.get()
-                bot_config.BAN_ON_REPEATED_LINK_VIOLATION = self.ban_repeated_links_var.get()
-                
-                domains_text = self.trusted_domains_var.get().strip()
-                if domains_text:
-                    bot_config.TRUSTED_DOMAINS = [domain.strip() for domain in domains_text.split(",") if domain.strip()]
-                else:
-                    bot_config.TRUSTED_DOMAINS = []
+                self._apply_trust_settings()
             
-            # Сохраняем в переменные окружения И в .env файл
+            # Сохраняем в переменные окружения (в памяти процесса) и одной записью в .env файл
             save_config_to_env(bot_config)
-            
-            # Импортируем и используем новую функцию
-            from config import save_to_env_file
             save_to_env_file(bot_config)
             
-            self.status_text.set("Настройки сохранены")
-            messagebox.showinfo("Успех", "Настройки успешно сохранены!")
+            self._toast("Настройки сохранены")
             
         except Exception as e:
             messagebox.showerror("Ошибка", f"Не удалось сохранить настройки: {e}")
@@ -857,36 +1243,26 @@ class ModerationGUI:
     def load_settings(self):
         """Загрузка настроек из конфигурации"""
         try:
-            # Перезагружаем конфигурацию из переменных окружения
-            from config import load_config_from_env
-            updated_config = load_config_from_env()
-            
-            # Обновляем глобальную конфигурацию
             import config
-            config.bot_config = updated_config
+            if config.env_file_changed():
+                # .env изменился с момента загрузки - перечитываем его и обновляем глобальную конфигурацию
+                config.load_env_file()
+                config.bot_config = config.load_config_from_env()
+            # Иначе config.bot_config уже собран из актуального .env при импорте
+            updated_config = config.bot_config
             
             # Основные настройки
             if hasattr(self, 'bot_token_var'):
-                self.bot_token_var.set(updated_config.BOT_TOKEN or "")
-                self.chat_id_var.set(updated_config.CHAT_ID or "")
-                self.admin_chat_id_var.set(updated_config.ADMIN_CHAT_ID or "")
-                self.openai_key_var.set(updated_config.OPENAI_API_KEY or "")
-                self.openai_model_var.set(updated_config.OPENAI_MODEL or "gpt-3.5-turbo")
-                self.use_openai_var.set(updated_config.USE_OPENAI_ANALYSIS)
-                self.openai_threshold_var.set(updated_config.OPENAI_ANALYSIS_THRESHOLD)
-                self.auto_delete_var.set(updated_config.AUTO_DELETE_BANNED_WORDS)
-                self.auto_ban_var.set(updated_config.AUTO_BAN_ON_BANNED_WORDS)
-                self.ban_duration_var.set(updated_config.BAN_DURATION_MINUTES)
-                self.warning_threshold_var.set(updated_config.WARNING_THRESHOLD)
+                for attr, var_name, default in SETTINGS_FIELDS:
+                    value = getattr(updated_config, attr)
+                    if isinstance(default, str):
+                        value = value or default
+                    getattr(self, var_name).set(value)
             
             # Настройки системы доверия (если вкладка создана)
             if hasattr(self, 'trust_enabled_var'):
-                self.trust_enabled_var.set(updated_config.TRUST_SYSTEM_ENABLED)
-                self.link_detection_var.set(updated_config.LINK_DETECTION_ENABLED)
-                self.trust_days_var.set(updated_config.TRUST_DAYS_THRESHOLD)
-                self.trust_messages_var.set(updated_config.TRUST_MESSAGES_THRESHOLD)
-                self.auto_delete_links_var.set(updated_config.AUTO_DELETE_LINKS_FROM_NEW)
-                self.ban_repeated_links_var.set(updated_config.BAN_ON_REPEATED_LINK_VIOLATION)
+                for attr, var_name in TRUST_SETTINGS_FIELDS:
+                    getattr(self, var_name).set(getattr(updated_config, attr))
                 self.trusted_domains_var.set(",".join(updated_config.TRUSTED_DOMAINS or []))
             
             self.logger.info("Настройки загружены успешно") if hasattr(self, 'logger') else print("Настройки загружены")
@@ -902,48 +1278,93 @@ class ModerationGUI:
         """Сброс настроек"""
         if messagebox.askyesno("Подтверждение", "Сбросить все настройки к значениям по умолчанию?"):
             # Очищаем переменные
-            self.bot_token_var.set("")
-            self.chat_id_var.set("")
-            self.admin_chat_id_var.set("")
-            self.openai_key_var.set("")
-            self.openai_model_var.set("gpt-3.5-turbo")
-            self.use_openai_var.set(True)
-            self.openai_threshold_var.set(0.7)
-            self.auto_delete_var.set(True)
-            self.auto_ban_var.set(True)
-            self.ban_duration_var.set(60)
-            self.warning_threshold_var.set(3)
+            for _, var_name, default in SETTINGS_FIELDS:
+                getattr(self, var_name).set(default)
     
     def test_connections(self):
-        """Тестирование подключений"""
+        """Тестирование подключений (выполняется в цикле событий бота, UI не блокируется)"""
+        if str(self.test_btn['state']) == 'disabled':
+            return  # Тест уже идет
+        
         self.status_text.set("Тестирование подключений...")
+        self.test_btn.config(state='disabled')
+        
+        # Тест OpenAI с ограничением по времени, чтобы недоступный сервис не повесил проверку
+        future = asyncio.run_coroutine_threadsafe(
+            asyncio.wait_for(analyzer.test_connection(), CONNECTION_TEST_TIMEOUT), self._bot_loop
+        )
+        future.add_done_callback(lambda f: self.root.after(0, self._show_test_result, f))
+    
+    def _show_test_result(self, future):
+        """Показать результат теста подключений (вызывается в потоке Tk)"""
+        self.test_btn.config(state='normal')
+        
+        error = future.exception()
+        if isinstance(error, asyncio.TimeoutError):
+            openai_result = False
+        elif error:
+            self.status_text.set("Ошибка тестирования")
+            messagebox.showerror("Ошибка", f"Ошибка тестирования: {error}")
+            return
+        else:
+            openai_result = future.result()
         
-        def test_async():
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
+        result_text = f"OpenAI API: {'✅ Успешно' if openai_result else '❌ Ошибка'}"
+        self.status_text.set("Тестирование завершено")
+        messagebox.showinfo("Результат тестирования", result_text)
+    
+    def _post(self, key: str, func, *args):
+        """
+        Выполнить func(*args) в потоке Tk, когда цикл событий освободится
+        
+        Повторные вызовы с тем же key до выполнения склеиваются в один,
+        выполняется последний из них. Можно вызывать из любого потока.
+        """
+        with self._pending_lock:
+            scheduled = key in self._pending_posts
+            self._pending_posts[key] = (func, args)
+        if not scheduled:
+            self.root.after_idle(self._run_post, key)
+    
+    def _run_post(self, key: str):
+        """Выполнить отложенное обновление интерфейса"""
+        with self._pending_lock:
+            func, args = self._pending_posts.pop(key)
+        func(*args)
+    
+    def _submit_db(self, query, on_result, on_error, key: str = None):
+        """
+        Выполнить query в пуле потоков БД
+        
+        on_result(результат) или on_error(исключение) вызываются в потоке Tk.
+        С key результаты, пришедшие за один цикл Tk, отрисовываются один раз.
+        """
+        def deliver(future):
+            if self._shut_down:
+                return
             try:
-                # Тест OpenAI
-                openai_result = loop.run_until_complete(analyzer.test_connection())
-                
-                # Результат
-                result_text = f"OpenAI API: {'✅ Успешно' if openai_result else '❌ Ошибка'}"
-                
-                self.root.after(0, lambda: messagebox.showinfo("Результат тестирования", result_text))
-                self.root.after(0, lambda: self.status_text.set("Тестирование завершено"))
-                
+                result = future.result()
             except Exception as e:
-                self.root.after(0, lambda: messagebox.showerror("Ошибка", f"Ошибка тестирования: {e}"))
-            finally:
-                loop.close()
+                self.root.after(0, on_error, e)
+            else:
+                if key:
+                    self._post(key, on_result, result)
+                else:
+                    self.root.after(0, on_result, result)
         
-        threading.Thread(target=test_async, daemon=True).start()
+        future = self._db_executor.submit(query)
+        future.add_done_callback(deliver)
+        return future
     
     def update_db_stats(self):
         """Обновление статистики базы данных"""
-        try:
-            stats = db.get_statistics()
-            
-            stats_text = f"""📊 Статистика базы данных:
+        self._submit_db(_get_statistics, self._show_db_stats,
+                        lambda e: messagebox.showerror("Ошибка", f"Не удалось обновить статистику: {e}"),
+                        key='db_stats')
+    
+    def _show_db_stats(self, stats: Dict[str, Any]):
+        """Отрисовать статистику базы данных"""
+        stats_text = f"""📊 Статистика базы данных:
 
 👥 Пользователи:
    • Всего пользователей: {stats.get('total_users', 0)}
@@ -954,48 +1375,58 @@ class ModerationGUI:
    • За последние 24 часа: {stats.get('violations_24h', 0)}
 
 🔥 Топ нарушений:"""
-            
-            for violation_type, count in stats.get('top_violations', []):
-                violation_name = VIOLATION_TYPES.get(violation_type, violation_type)
-                stats_text += f"\n   • {violation_name}: {count}"
-            
-            self.db_stats_text.delete(1.0, tk.END)
-            self.db_stats_text.insert(tk.END, stats_text)
-            
-        except Exception as e:
-            messagebox.showerror("Ошибка", f"Не удалось обновить статистику: {e}")
+        
+        for violation_type, count in stats.get('top_violations', []):
+            violation_name = VIOLATION_TYPES.get(violation_type, violation_type)
+            stats_text += f"\n   • {violation_name}: {count}"
+        
+        self.db_stats_text.delete(1.0, tk.END)
+        self.db_stats_text.insert(tk.END, stats_text)
     
     def cleanup_bans(self):
         """Очистка истекших банов"""
-        try:
-            cleaned_count = db.cleanup_expired_bans()
-            messagebox.showinfo("Результат", f"Очищено {cleaned_count} истекших банов")
+        def on_result(cleaned_count):
+            _get_statistics.cache_clear()
+            self._toast(f"Очищено {cleaned_count} истекших банов")
             self.update_db_stats()
-        except Exception as e:
-            messagebox.showerror("Ошибка", f"Не удалось очистить баны: {e}")
+        
+        self._submit_db(get_db().cleanup_expired_bans, on_result,
+                        lambda e: messagebox.showerror("Ошибка", f"Не удалось очистить баны: {e}"))
     
-    def search_user(self):
-        """Поиск пользователя"""
+    def search_user(self, reload_history: bool = True):
+        """
+        Поиск пользователя
+        
+        reload_history=False - обновить только карточку пользователя: действия
+        (предупреждение, бан, разбан) не меняют историю нарушений.
+        """
         try:
             user_id = int(self.user_search_var.get())
-            user = db.get_user(user_id)
-            
-            if not user:
-                self.user_info_text.delete(1.0, tk.END)
-                self.user_info_text.insert(tk.END, "Пользователь не найден")
-                return
-            
-            # Отображаем информацию о пользователе
-
-            trust_level_names = {
-                'new': 'Новый',
-                'trusted': 'Доверенный',
-                'suspicious': 'Подозрительный'
-            }
-
-            trust_level_name = trust_level_names.get(user.trust_level, user.trust_level)
+        except ValueError:
+            messagebox.showerror("Ошибка", "Некорректный ID пользователя")
+            return
+        
+        self._searched_user_id = user_id
+        self._submit_db(lambda: get_db().get_user(user_id),
+                        lambda user: self._show_user(user_id, user, reload_history),
+                        lambda e: messagebox.showerror("Ошибка", f"Ошибка поиска пользователя: {e}"))
+    
+    def _show_user(self, user_id: int, user, reload_history: bool = True):
+        """Отрисовать найденного пользователя и загрузить его нарушения"""
+        # Пока шел запрос, успели искать другого пользователя
+        if user_id != self._searched_user_id:
+            return
+        
+        if not user:
+            self.user_info_text.delete(1.0, tk.END)
+            self.user_info_text.insert(tk.END, "Пользователь не найден")
+            self.appeals_info_text.delete(1.0, tk.END)
+            return
+        
+        # Отображаем информацию о пользователе
+        trust_level_name = TRUST_LEVEL_NAMES.get(user.trust_level, user.trust_level)
 
-            info_text = f"""👤 Информация о пользователе {user_id}:
+        info_text = f"""👤 Информация о пользователе {user_id}:
 
 📝 Данные:
    • Имя: {user.first_name or 'Не указано'}
@@ -1011,48 +1442,79 @@ class ModerationGUI:
    • Нарушений по ссылкам: {user.link_violations_count}
    • В чате с: {user.joined_chat_at.strftime('%d.%m.%Y') if user.joined_chat_at else 'Неизвестно'}
    • Последняя активность: {user.last_message_at.strftime('%d.%m.%Y %H:%M') if user.last_message_at else 'Неизвестно'}"""
-            
-            if user.ban_until:
-                info_text += f"\n   • Бан до: {user.ban_until.strftime('%d.%m.%Y %H:%M')}"
-            
-            self.user_info_text.delete(1.0, tk.END)
-            self.user_info_text.insert(tk.END, info_text)
-            
-            # Загружаем нарушения
+        
+        if user.ban_until:
+            info_text += f"\n   • Бан до: {user.ban_until.strftime('%d.%m.%Y %H:%M')}"
+        
+        self.user_info_text.delete(1.0, tk.END)
+        self.user_info_text.insert(tk.END, info_text)
+        
+        # Загружаем нарушения, если таблица показывает другого пользователя или нужна свежая история
+        if reload_history or user_id != self._violations_user:
             self.load_user_violations(user_id)
-            
-        except ValueError:
-            messagebox.showerror("Ошибка", "Некорректный ID пользователя")
-        except Exception as e:
-            messagebox.showerror("Ошибка", f"Ошибка поиска пользователя: {e}")
+            self.load_user_appeals(user_id)
     
     def load_user_violations(self, user_id: int):
         """Загрузка нарушений пользователя"""
-        try:
-            # Очищаем таблицу
-            for item in self.violations_tree.get_children():
-                self.violations_tree.delete(item)
-            
-            violations = db.get_user_violations(user_id, 20)
-            
-            for violation in violations:
-                date_str = violation.created_at.strftime('%d.%m %H:%M') if violation.created_at else 'Неизвестно'
-                violation_name = VIOLATION_TYPES.get(violation.violation_type, violation.violation_type)
-                action_name = MODERATION_ACTIONS.get(violation.action_taken, violation.action_taken)
-                confidence_str = f"{violation.ai_confidence:.2f}" if violation.ai_confidence else "N/A"
-                
-                self.violations_tree.insert('', 'end', values=(date_str, violation_name, action_name, confidence_str))
-                
-        except Exception as e:
+        # Очищаем таблицу одним вызовом
+        self.violations_tree.delete(*self.violations_tree.get_children())
+        
+        self._violations_user = user_id
+        self._violations_offset = 0
+        self._violations_exhausted = False
+        self._violations_loading = True
+        self._load_more_violations()
+    
+    def _load_more_violations(self):
+        """Запросить следующую страницу нарушений"""
+        user_id, offset = self._violations_user, self._violations_offset
+        
+        def on_error(e):
+            if user_id == self._violations_user:
+                self._violations_exhausted = True
+                self._violations_loading = False
             messagebox.showerror("Ошибка", f"Ошибка загрузки нарушений: {e}")
+        
+        self._submit_db(lambda: get_db().get_user_violations(user_id, VIOLATIONS_PAGE_SIZE, offset),
+                        lambda violations: self._append_violations(user_id, offset, violations),
+                        on_error)
+    
+    def _append_violations(self, user_id: int, offset: int, violations):
+        """Добавить страницу нарушений в таблицу"""
+        # Ответ на устаревший запрос: таблицу уже перезагрузили
+        if user_id != self._violations_user or offset != self._violations_offset:
+            return
+        
+        self._violations_offset += len(violations)
+        self._violations_exhausted = len(violations) < VIOLATIONS_PAGE_SIZE
+        self._violations_loading = False
+        
+        # Строки готовим целиком до обращения к Tk, затем вставляем подряд
+        short_datetime = _short_datetime
+        violation_names = VIOLATION_TYPES.get
+        action_names = MODERATION_ACTIONS.get
+        rows = [
+            (
+                short_datetime(violation.created_at) if violation.created_at else 'Неизвестно',
+                violation_names(violation.violation_type, violation.violation_type),
+                action_names(violation.action_taken, violation.action_taken),
+                f"{violation.ai_confidence:.2f}" if violation.ai_confidence else "N/A",
+            )
+            for violation in violations
+        ]
+        
+        insert = self.violations_tree.insert
+        for values in rows:
+            insert('', 'end', values=values)
     
     def warn_user(self):
         """Выдача предупреждения пользователю"""
         try:
             user_id = int(self.user_search_var.get())
-            warnings_count = db.add_warning(user_id)
-            messagebox.showinfo("Успех", f"Пользователю {user_id} выдано предупреждение. Всего: {warnings_count}")
-            self.search_user()  # Обновляем информацию
+            warnings_count = get_db().add_warning(user_id)
+            _get_statistics.cache_clear()
+            self._toast(f"Пользователю {user_id} выдано предупреждение. Всего: {warnings_count}")
+            self.search_user(reload_history=False)  # Обновляем информацию
         except ValueError:
             messagebox.showerror("Ошибка", "Некорректный ID пользователя")
         except Exception as e:
@@ -1064,9 +1526,10 @@ class ModerationGUI:
             user_id = int(self.user_search_var.get())
             duration = self.ban_time_var.get()
             
-            db.ban_user(user_id, duration)
-            messagebox.showinfo("Успех", f"Пользователь {user_id} заблокирован на {duration} минут")
-            self.search_user()  # Обновляем информацию
+            get_db().ban_user(user_id, duration)
+            _get_statistics.cache_clear()
+            self._toast(f"Пользователь {user_id} заблокирован на {duration} минут")
+            self.search_user(reload_history=False)  # Обновляем информацию
         except ValueError:
             messagebox.showerror("Ошибка", "Некорректный ID пользователя")
         except Exception as e:
@@ -1076,9 +1539,10 @@ class ModerationGUI:
         """Разблокировка пользователя"""
         try:
             user_id = int(self.user_search_var.get())
-            db.unban_user(user_id)
-            messagebox.showinfo("Успех", f"Пользователь {user_id} разблокирован")
-            self.search_user()  # Обновляем информацию
+            get_db().unban_user(user_id)
+            _get_statistics.cache_clear()
+            self._toast(f"Пользователь {user_id} разблокирован")
+            self.search_user(reload_history=False)  # Обновляем информацию
         except ValueError:
             messagebox.showerror("Ошибка", "Некорректный ID пользователя")
         except Exception as e:
@@ -1086,42 +1550,95 @@ class ModerationGUI:
 
     def load_user_appeals(self, user_id: int):
         """Загрузка обжалований пользователя"""
-        try:
-            # Здесь можно добавить метод в database.py для получения обжалований пользователя
-            appeals = db.get_user_appeals(user_id, 5)  # Нужно добавить этот метод в database.py
-            
-            self.appeals_info_text.delete(1.0, tk.END)
-            
-            if not appeals:
-                self.appeals_info_text.insert(tk.END, "Обжалований нет")
-                return
-            
-            for appeal in appeals:
-                status_text = {"pending": "Ожидает", "approved": "Принято", "rejected": "Отклонено"}
-                status = status_text.get(appeal.status, appeal.status)
-                date_str = appeal.created_at.strftime('%d.%m %H:%M') if appeal.created_at else 'Неизвестно'
-                
-                self.appeals_info_text.insert(tk.END, f"#{appeal.id} - {status} ({date_str})\n")
-                self.appeals_info_text.insert(tk.END, f"{appeal.appeal_text[:100]}...\n\n")
-        
-        except Exception as e:
+        def on_error(e):
             self.appeals_info_text.delete(1.0, tk.END)
             self.appeals_info_text.insert(tk.END, f"Ошибка загрузки: {e}")
+        
+        self._submit_db(lambda: get_db().get_user_appeals(user_id, 5),
+                        lambda appeals: self._show_user_appeals(user_id, appeals), on_error)
+    
+    def _show_user_appeals(self, user_id: int, appeals):
+        """Отрисовать обжалования пользователя"""
+        # Пока шел запрос, успели искать другого пользователя
+        if user_id != self._searched_user_id:
+            return
+        
+        self.appeals_info_text.delete(1.0, tk.END)
+        
+        if not appeals:
+            self.appeals_info_text.insert(tk.END, "Обжалований нет")
+            return
+        
+        # Весь список - одной вставкой в виджет
+        self.appeals_info_text.insert(tk.END, "".join(
+            f"#{appeal.id} - {APPEAL_STATUS_NAMES.get(appeal.status, appeal.status)} "
+            f"({_short_datetime(appeal.created_at) if appeal.created_at else 'Неизвестно'})\n"
+            f"{appeal.appeal_text[:100]}...\n\n"
+            for appeal in appeals
+        ))
     
     def load_banned_words(self):
         """Загрузка списка запрещенных слов"""
-        self.words_listbox.delete(0, tk.END)
-        for word in sorted(BANNED_WORDS):
-            self.words_listbox.insert(tk.END, word)
+        # Кэши пересобираются сами по версии списка после добавления, удаления или импорта
+        self.filter_banned_words()
+    
+    def _on_search_changed(self, *args):
+        """Отложить фильтрацию до паузы в наборе текста"""
+        if self._search_after_id:
+            self.root.after_cancel(self._search_after_id)
+        self._search_after_id = self.root.after(SEARCH_DEBOUNCE_MS, self.filter_banned_words)
     
     def filter_banned_words(self, *args):
         """Фильтрация списка запрещенных слов"""
+        # Прямой вызов (Enter, изменение списка) заменяет отложенный
+        if self._search_after_id:
+            self.root.after_cancel(self._search_after_id)
+            self._search_after_id = None
         search_term = self.search_words_var.get().lower()
-        self.words_listbox.delete(0, tk.END)
+        filtered = _filter_banned_words(search_term, get_banned_words_version())
+        if filtered == self._filtered_words:
+            # Результат не изменился - не сбрасываем прокрутку и не перерисовываем
+            return
+        self._filtered_words = filtered
+        
+        if self._selected_word not in self._filtered_words:
+            self._selected_word = None
         
-        for word in sorted(BANNED_WORDS):
-            if search_term in word.lower():
-                self.words_listbox.insert(tk.END, word)
+        canvas = self.words_canvas
+        canvas.configure(scrollregion=(0, 0, 0, len(self._filtered_words) * self._words_row_h))
+        canvas.yview_moveto(0)
+        self._render_words_viewport()
+    
+    def _scroll_words(self, *args):
+        """Прокрутка списка слов с перерисовкой видимой области"""
+        self.words_canvas.yview(*args)
+        self._render_words_viewport()
+    
+    def _render_words_viewport(self):
+        """Отрисовать только строки, попадающие в видимую область канваса"""
+        canvas = self.words_canvas
+        row_h = self._words_row_h
+        width = canvas.winfo_width()
+        
+        first = int(canvas.canvasy(0) // row_h)
+        last = first + canvas.winfo_height() // row_h + 2
+        
+        visible = self._filtered_words[first:last]
+        
+        canvas.delete("row")
+        if self._selected_word in visible:
+            y = (first + visible.index(self._selected_word)) * row_h
+            canvas.create_rectangle(0, y, width, y + row_h, fill="#cce5ff", outline="", tags="row")
+        # Все видимые строки - один текстовый элемент, то есть один вызов Tcl
+        canvas.create_text(4, first * row_h, text="\n".join(visible), anchor=tk.NW,
+                           font=self._words_font, tags="row")
+    
+    def _on_words_click(self, event):
+        """Выбор слова щелчком по строке"""
+        index = int(self.words_canvas.canvasy(event.y) // self._words_row_h)
+        if 0 <= index < len(self._filtered_words):
+            self._selected_word = self._filtered_words[index]
+            self._render_words_viewport()
     
     def add_banned_word(self):
         """Добавление запрещенного слова"""
@@ -1133,22 +1650,21 @@ class ModerationGUI:
         if add_banned_word(word):
             self.load_banned_words()
             self.new_word_var.set("")
-            messagebox.showinfo("Успех", f"Слово '{word}' добавлено в список")
+            self._toast(f"Слово '{word}' добавлено в список")
         else:
-            messagebox.showwarning("Предупреждение", f"Слово '{word}' уже есть в списке")
+            self._toast(f"Слово '{word}' уже есть в списке")
     
     def remove_banned_word(self):
         """Удаление запрещенного слова"""
-        selection = self.words_listbox.curselection()
-        if not selection:
+        word = self._selected_word
+        if not word:
             messagebox.showwarning("Предупреждение", "Выберите слово для удаления")
             return
         
-        word = self.words_listbox.get(selection[0])
         if messagebox.askyesno("Подтверждение", f"Удалить слово '{word}' из списка?"):
             if remove_banned_word(word):
                 self.load_banned_words()
-                messagebox.showinfo("Успех", f"Слово '{word}' удалено из списка")
+                self._toast(f"Слово '{word}' удалено из списка")
             else:
                 messagebox.showerror("Ошибка", f"Не удалось удалить слово '{word}'")
     
@@ -1162,11 +1678,12 @@ class ModerationGUI:
             )
             
             if filename:
-                with open(filename, 'w', encoding='utf-8') as f:
-                    for word in sorted(BANNED_WORDS):
-                        f.write(word + '\n')
+                # Один буфер и одна запись вместо записи по слову; пустой последний
+                # элемент дает завершающий перевод строки без копирования всей строки
+                words, _ = _sorted_banned_words(get_banned_words_version())
+                Path(filename).write_bytes("\n".join((*words, "")).encode('utf-8'))
                 
-                messagebox.showinfo("Успех", f"Список сохранен в файл {filename}")
+                self._toast(f"Список сохранен в файл {filename}")
                 
         except Exception as e:
             messagebox.showerror("Ошибка", f"Ошибка экспорта: {e}")
@@ -1180,16 +1697,14 @@ class ModerationGUI:
             )
             
             if filename:
-                with open(filename, 'r', encoding='utf-8') as f:
-                    words = [line.strip() for line in f if line.strip()]
+                lines = Path(filename).read_bytes().decode('utf-8').splitlines()
+                words = [line.strip() for line in lines if line.strip()]
                 
-                added_count = 0
-                for word in words:
-                    if add_banned_word(word):
-                        added_count += 1
+                # Пакетное добавление: список сверяется один раз, а не на каждое слово
+                added_count = add_banned_words(words)
                 
                 self.load_banned_words()
-                messagebox.showinfo("Успех", f"Добавлено {added_count} новых слов из файла {filename}")
+                self._toast(f"Добавлено {added_count} новых слов из файла {filename}")
                 
         except Exception as e:
             messagebox.showerror("Ошибка", f"Ошибка импорта: {e}")
@@ -1198,29 +1713,139 @@ class ModerationGUI:
         """Загрузка логов"""
         try:
             if os.path.exists(bot_config.LOG_FILE):
-                with open(bot_config.LOG_FILE, 'r', encoding='utf-8') as f:
-                    logs = f.read()
-                
-                self.logs_text.delete(1.0, tk.END)
-                self.logs_text.insert(tk.END, logs)
-                
-                if self.auto_scroll_var.get():
-                    self.logs_text.see(tk.END)
+                min_level = LOG_LEVELS.get(self.log_level_var.get(), logging.DEBUG)
+                lines, self._log_pos = self._read_log_tail(bot_config.LOG_FILE)
+                self._log_buffer.clear()
+                self._log_buffer.extend(self._filter_log_lines(lines, min_level))
+                self._render_logs(force=True)
             else:
+                self._log_pos = 0
                 self.logs_text.delete(1.0, tk.END)
                 self.logs_text.insert(tk.END, "Файл логов не найден")
                 
         except Exception as e:
             messagebox.showerror("Ошибка", f"Ошибка загрузки логов: {e}")
     
+    @staticmethod
+    def _read_log_tail(path: str) -> Tuple[list, int]:
+        """Прочитать последние LOG_TAIL_BYTES байт файла логов; возвращает строки и позицию конца"""
+        with open(path, 'rb') as f:
+            size = f.seek(0, os.SEEK_END)
+            start = max(0, size - LOG_TAIL_BYTES)
+            f.seek(start)
+            data = f.read()
+        
+        # Незавершенную последнюю строку оставляем до следующего чтения
+        end = data.rfind(b'\n') + 1
+        lines = data[:end].decode('utf-8', errors='replace').splitlines()
+        
+        # Первая строка хвоста, скорее всего, обрезана посередине
+        if start > 0 and lines:
+            lines = lines[1:]
+        return lines, start + end
+    
+    @staticmethod
+    def _read_log_since(path: str, pos: int) -> Tuple[list, int]:
+        """Прочитать полные строки, дописанные в файл логов после позиции pos"""
+        with open(path, 'rb') as f:
+            f.seek(pos)
+            data = f.read()
+        end = data.rfind(b'\n') + 1
+        return data[:end].decode('utf-8', errors='replace').splitlines(), pos + end
+    
+    def _poll_logs(self):
+        """Дочитать новые строки логов (таймер вызывает, пока открыта вкладка логов)"""
+        try:
+            size = os.stat(bot_config.LOG_FILE).st_size
+        except OSError:
+            return
+        
+        if size == self._log_pos:
+            return
+        if size < self._log_pos or size - self._log_pos > LOG_TAIL_BYTES:
+            # Файл очищен или пересоздан, либо новых данных больше хвоста - перечитываем хвост
+            self.load_logs()
+            return
+        
+        try:
+            lines, self._log_pos = self._read_log_since(bot_config.LOG_FILE, self._log_pos)
+        except OSError as e:
+            print(f"Ошибка чтения логов: {e}")
+            return
+        
+        min_level = LOG_LEVELS.get(self.log_level_var.get(), logging.DEBUG)
+        lines = self._filter_log_lines(lines, min_level)
+        if lines:
+            self._append_logs(lines)
+    
+    def _append_logs(self, lines: list):
+        """Добавить новые строки в буфер и дописать их в конец области логов"""
+        self._log_buffer.extend(lines)
+        logs_text = self.logs_text
+        auto_scroll = self.auto_scroll_var.get()
+        
+        if self._logs_stale or (not auto_scroll and logs_text.yview()[1] < 1.0):
+            # Пользователь читает историю: строки копятся в буфере, виджет
+            # перерисуется целиком, когда он вернется к концу
+            self._logs_stale = True
+            self._render_logs()
+            return
+        
+        prefix = "\n" if logs_text.compare('end-1c', '!=', '1.0') else ""
+        logs_text.insert(tk.END, prefix + "\n".join(lines))
+        
+        # Держим в виджете не больше строк, чем в буфере
+        excess = int(logs_text.index('end-1c').split('.')[0]) - LOG_BUFFER_LINES
+        if excess > 0:
+            logs_text.delete('1.0', f'{excess + 1}.0')
+        
+        if auto_scroll:
+            logs_text.see(tk.END)
+    
+    @staticmethod
+    def _filter_log_lines(lines: list, min_level: int) -> list:
+        """Оставить записи с уровнем не ниже min_level"""
+        if min_level <= logging.DEBUG:
+            return lines
+        
+        match = _LOG_LEVEL_RE.match
+        result = []
+        keep = True
+        for line in lines:
+            m = match(line)
+            # Строки без заголовка (трассировки) относятся к предыдущей записи
+            if m:
+                keep = LOG_LEVELS[m.group(1)] >= min_level
+            if keep:
+                result.append(line)
+        return result
+    
+    def _render_logs(self, force: bool = False):
+        """Перерисовать область логов из кольцевого буфера"""
+        logs_text = self.logs_text
+        auto_scroll = self.auto_scroll_var.get()
+        
+        # Пользователь прокрутил вверх и читает историю - не сбиваем позицию
+        if not force and not auto_scroll and logs_text.yview()[1] < 1.0:
+            return
+        
+        self._logs_stale = False
+        logs_text.delete(1.0, tk.END)
+        logs_text.insert(tk.END, "\n".join(self._log_buffer))
+        
+        if auto_scroll:
+            logs_text.see(tk.END)
+    
     def clear_logs(self):
         """Очистка логов"""
         if messagebox.askyesno("Подтверждение", "Очистить все логи?"):
             try:
                 with open(bot_config.LOG_FILE, 'w', encoding='utf-8') as f:
                     f.write("")
+                self._log_buffer.clear()
+                self._log_pos = 0
                 self.logs_text.delete(1.0, tk.END)
-                messagebox.showinfo("Успех", "Логи очищены")
+                self._toast("Логи очищены")
             except Exception as e:
                 messagebox.showerror("Ошибка", f"Ошибка очистки логов: {e}")
     
@@ -1234,11 +1859,11 @@ class ModerationGUI:
             )
             
             if filename:
-                with open(bot_config.LOG_FILE, 'r', encoding='utf-8') as src:
-                    with open(filename, 'w', encoding='utf-8') as dst:
-                        dst.write(src.read())
+                # Копируем байты кусками, не загружая весь файл в память
+                with open(bot_config.LOG_FILE, 'rb') as src, open(filename, 'wb') as dst:
+                    shutil.copyfileobj(src, dst, LOG_EXPORT_CHUNK)
                 
-                messagebox.showinfo("Успех", f"Логи сохранены в файл {filename}")
+                self._toast(f"Логи сохранены в файл {filename}")
                 
         except Exception as e:
             messagebox.showerror("Ошибка", f"Ошибка экспорта логов: {e}")
@@ -1260,7 +1885,7 @@ class ModerationGUI:
                     if hasattr(self, f"{key}_var"):
                         getattr(self, f"{key}_var").set(value)
                 
-                messagebox.showinfo("Успех", f"Настройки загружены из файла {filename}")
+                self._toast(f"Настройки загружены из файла {filename}")
                 
         except Exception as e:
             messagebox.showerror("Ошибка", f"Ошибка загрузки настроек: {e}")
@@ -1295,12 +1920,28 @@ Telegram Bot Модерация СКВ СПб
         
         if self.bot_running:
             if messagebox.askyesno("Подтверждение", "Бот все еще работает. Остановить его и выйти?"):
+                # Окно закроется, как только остановка завершится в цикле бота;
+                # если она зависнет - не позже чем через BOT_STOP_TIMEOUT_MS
+                self._closing = True
                 self.stop_bot()
-                # Даем время на остановку
-                self.root.after(2000, self.root.destroy)
+                self.root.after(BOT_STOP_TIMEOUT_MS, self._shutdown)
+            return
+        
+        self._shutdown()
+    
+    def _shutdown(self):
+        """Остановить цикл событий бота и закрыть окно"""
+        if self._shut_down:
             return
+        self._shut_down = True
         
         self.status_update_running = False
+        loop = self._bot_loop
+        loop.call_soon_threadsafe(loop.stop)
+        self.bot_thread.join(timeout=1)
+        if not loop.is_running():
+            loop.close()
+        self._db_executor.shutdown(wait=False)
         self.root.destroy()
     
     def run(self):
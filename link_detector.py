@@ -4,17 +4,30 @@
 """
 
 import re
-from urllib.parse import urlparse
-from typing import List, Tuple
+from functools import lru_cache
+from typing import FrozenSet, Iterator, List, Tuple
 
 # Регулярные выражения для поиска ссылок
 URL_PATTERNS = [
     r'https?://[^\s]+',  # http/https ссылки
     r'www\.[^\s]+',      # www ссылки
     r't\.me/[^\s]+',     # Telegram ссылки
-    r'@[a-zA-Z0-9_]+',   # Telegram username
+    r'@[a-zA-Z0-9_]{4,32}\b',  # Telegram username (не длиннее 32 символов)
 ]
 
+# Все шаблоны одним выражением, скомпилированным при импорте: текст просматривается
+# за один проход, а вложенные совпадения (www. внутри https://...) не дублируются.
+# Сторонний движок (regex, Hyperscan) не нужен: выражение запускается только для
+# сообщений, прошедших проверку _LINK_HINTS, а сообщения чата короткие.
+# Без re.IGNORECASE: выражение применяется к тексту, уже переведенному в нижний регистр
+_URL_RE = re.compile("|".join(f"(?:{pattern})" for pattern in URL_PATTERNS))
+
+# Подстроки, без которых ни один шаблон не совпадет (в нижнем регистре)
+_LINK_HINTS = ('http', 'www.', 't.me/')
+
+# Символы, которые регулярное выражение захватывает вместе со ссылкой из текста
+_HOST_TRAILING_PUNCTUATION = '.,;:!?)]}>\'"'
+
 # Доверенные домены по умолчанию
 DEFAULT_TRUSTED_DOMAINS = ["t.me", "youtube.com", "youtu.be"]
 
@@ -25,16 +38,28 @@ def detect_links(text: str) -> Tuple[bool, List[str]]:
     Returns:
         tuple: (найдены ли ссылки, список найденных ссылок)
     """
+    found_links = list(_iter_links(text))
+    return len(found_links) > 0, found_links
+
+def _iter_links(text: str) -> Iterator[str]:
+    """Ссылки в тексте по одной, по мере поиска"""
     if not text:
-        return False, []
-        
-    found_links = []
+        return
     
-    for pattern in URL_PATTERNS:
-        matches = re.findall(pattern, text, re.IGNORECASE)
-        found_links.extend(matches)
+    text_lower = text.lower()
     
-    return len(found_links) > 0, found_links
+    # В большинстве сообщений ссылок нет: поиск подстроки намного дешевле регулярного выражения
+    if '@' not in text and not any(hint in text_lower for hint in _LINK_HINTS):
+        return
+    
+    if len(text_lower) == len(text):
+        # Ищем в нижнем регистре, а ссылки возвращаем в исходном написании
+        for match in _URL_RE.finditer(text_lower):
+            yield text[match.start():match.end()]
+    else:
+        # lower() изменил длину текста (например, 'İ'): позиции не совпадают с исходным
+        for match in _URL_RE.finditer(text_lower):
+            yield match.group(0)
 
 def get_trusted_domains():
     """Получает список доверенных доменов из конфигурации"""
@@ -45,50 +70,97 @@ def get_trusted_domains():
     except (ImportError, AttributeError):
         return DEFAULT_TRUSTED_DOMAINS
 
+# Нормализованные доверенные домены: множество для точного совпадения
+# и кортеж суффиксов ".домен" для поддоменов
+TrustedDomains = Tuple[FrozenSet[str], Tuple[str, ...]]
+
+@lru_cache(maxsize=4)
+def _normalize_domains(domains: Tuple[str, ...]) -> TrustedDomains:
+    """Доверенные домены в нижнем регистре (пересчитывается только при смене списка)"""
+    names = frozenset(_ascii_domain(domain.strip().strip('.')) for domain in domains if domain.strip('. '))
+    return names, tuple('.' + name for name in names)
+
+def _trusted_domain_set() -> TrustedDomains:
+    """Текущий набор доверенных доменов, уже нормализованный"""
+    return _normalize_domains(tuple(get_trusted_domains()))
+
 def is_trusted_link(link: str) -> bool:
     """
     Проверяет, является ли ссылка доверенной
     """
     if not link:
         return False
-        
-    trusted_domains = get_trusted_domains()
-    
-    if not trusted_domains:
+    return _is_trusted_link(link, _trusted_domain_set())
+
+def _is_trusted_link(link: str, trusted_domains: TrustedDomains) -> bool:
+    """Проверка ссылки по готовому набору доверенных доменов"""
+    names, suffixes = trusted_domains
+    if not names:
         return False
     
+    domain = _link_host(link)
+    
+    # Сам домен или его поддомен (www.youtube.com, m.youtube.com), но не
+    # домен, где доверенный встречается подстрокой (evil-t.me.ru)
+    return domain in names or domain.endswith(suffixes)
+
+def _link_host(link: str) -> str:
+    """
+    Хост ссылки в нижнем регистре, без схемы, логина, порта и пути
+    
+    Ссылки от detect_links простые, поэтому хватает поиска разделителей
+    без полного разбора urlparse.
+    """
+    # Ссылки без протокола (www..., t.me/...) начинаются сразу с хоста
+    start = link.find('://')
+    host = link[start + 3:] if start >= 0 else link
+    
+    for separator in '/?#':
+        end = host.find(separator)
+        if end >= 0:
+            host = host[:end]
+    
+    host = host.rpartition('@')[2].partition(':')[0]
+    
+    # Знаки препинания после ссылки в тексте ("https://youtu.be, смотрите") - не часть хоста
+    return _ascii_domain(host.rstrip(_HOST_TRAILING_PUNCTUATION))
+
+def _ascii_domain(domain: str) -> str:
+    """
+    Домен в нижнем регистре в ASCII-записи
+    
+    Обычные домены уже ASCII, и им хватает быстрого lower(). Кириллические
+    (пример.рф) переводятся в punycode, чтобы совпадать с записью xn--...
+    и в ссылке, и в списке доверенных.
+    """
+    if domain.isascii():
+        return domain.lower()
     try:
-        # Обрабатываем ссылки без протокола
-        if not link.startswith(('http://', 'https://')):
-            link = 'http://' + link
-        
-        parsed = urlparse(link)
-        domain = parsed.netloc.lower()
-        
-        # Удаляем www. для сравнения
-        if domain.startswith('www.'):
-            domain = domain[4:]
-        
-        return any(trusted_domain.lower() in domain for trusted_domain in trusted_domains)
-        
-    except Exception:
-        return False
+        return domain.encode('idna').decode('ascii')
+    except UnicodeError:
+        # Некорректный домен (пустая метка, слишком длинная метка) - сравниваем как есть
+        return domain.lower()
 
 def has_suspicious_links(text: str) -> Tuple[bool, List[str]]:
     """
     Проверяет на подозрительные (недоверенные) ссылки
     """
-    if not text:
-        return False, []
-        
-    has_links, found_links = detect_links(text)
-    
-    if not has_links:
-        return False, []
+    suspicious_links = list(iter_suspicious_links(text))
+    return len(suspicious_links) > 0, suspicious_links
+
+def iter_suspicious_links(text: str) -> Iterator[str]:
+    """Недоверенные ссылки в тексте по одной, без промежуточного списка всех ссылок"""
+    links = _iter_links(text)
     
-    suspicious_links = []
-    for link in found_links:
-        if not is_trusted_link(link):
-            suspicious_links.append(link)
+    # Набор доверенных доменов берем один раз на сообщение, а не на каждую ссылку,
+    # и только если в тексте нашлась хотя бы одна ссылка
+    first_link = next(links, None)
+    if first_link is None:
+        return
+    trusted_domains = _trusted_domain_set()
     
-    return len(suspicious_links) > 0, suspicious_links
\ No newline at end of file
+    if not _is_trusted_link(first_link, trusted_domains):
+        yield first_link
+    for link in links:
+        if not _is_trusted_link(link, trusted_domains):
+            yield link
\ No newline at end of file
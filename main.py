@@ -97,8 +97,7 @@ async def run_console_mode():
         
         # Ждем до получения сигнала остановки
         try:
-            while bot.is_running:
-                await asyncio.sleep(1)
+            await bot.stopped_event.wait()
         except KeyboardInterrupt:
             print("\n🛑 Получен сигнал остановки...")
         
@@ -47,8 +47,7 @@ async def main():
         
         # Ждем до получения сигнала остановки
         try:
-            while bot.is_running:
-                await asyncio.sleep(1)
+            await bot.stopped_event.wait()
         except KeyboardInterrupt:
             print("\n🛑 Получен сигнал остановки...")
         
@@ -64,6 +63,13 @@ async def main():
         return False
 
 if __name__ == "__main__":
+    # Условный uvloop: быстрее стандартного цикла событий (есть только для Linux/macOS)
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+    
     # Запуск без GUI
     success = asyncio.run(main())
     sys.exit(0 if success else 1)
\ No newline at end of file
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+Тесты пакетной записи обжалований
+"""
+
+import asyncio
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from concurrent.futures import Future
+from pathlib import Path
+
+# Добавляем корень проекта в путь
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database import AppealUpdateResult, ModerationDatabase
+
+
+class AppealWriterTest(unittest.TestCase):
+    """Поток записи обжалований переживает отмененные обновления"""
+    
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db = ModerationDatabase(str(Path(self.tmp_dir) / "test.db"))
+        self.appeal_id = self.db.add_appeal(1, "Прошу разбанить")
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+    
+    def test_cancelled_future_is_skipped(self):
+        cancelled = Future()
+        cancelled.cancel()
+        pending = Future()
+        
+        self.db._write_appeal_batch([
+            (("rejected", 2, None, self.appeal_id), cancelled),
+            (("approved", 2, None, self.appeal_id), pending),
+        ])
+        
+        self.assertTrue(cancelled.cancelled())
+        self.assertIs(pending.result(timeout=1), AppealUpdateResult.UPDATED)
+        self.assertEqual(self.db.get_appeal_by_id(self.appeal_id).status, "approved")
+    
+    def test_dead_writer_is_restarted(self):
+        dead = threading.Thread(target=lambda: None)
+        dead.start()
+        dead.join()
+        self.db._appeal_writer = dead
+        
+        future = self.db.enqueue_update(self.appeal_id, "approved", 2)
+        
+        self.assertIs(future.result(timeout=5), AppealUpdateResult.UPDATED)
+        self.assertTrue(self.db._appeal_writer.is_alive())
+
+    
+    def test_cancelled_async_update_does_not_block_later_updates(self):
+        other_appeal_id = self.db.add_appeal(3, "И меня тоже")
+        
+        async def scenario():
+            task = asyncio.ensure_future(self.db.update_appeal_status_async(self.appeal_id, "rejected", 2))
+            await asyncio.sleep(0)  # обновление уже в очереди записи
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            
+            return await asyncio.wait_for(
+                self.db.update_appeal_status_async(other_appeal_id, "approved", 2), timeout=5
+            )
+        
+        self.assertTrue(asyncio.run(scenario()))
+        self.assertTrue(self.db._appeal_writer.is_alive())
+        # Отмененное ожидание не отменило саму запись
+        self.assertEqual(self.db.get_appeal_by_id(self.appeal_id).status, "rejected")
+        self.assertEqual(self.db.get_appeal_by_id(other_appeal_id).status, "approved")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""
+Тесты детектора ссылок
+"""
+
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+# Добавляем корень проекта в путь
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import link_detector
+from link_detector import DEFAULT_TRUSTED_DOMAINS, has_suspicious_links
+
+
+@mock.patch.object(link_detector, 'get_trusted_domains', return_value=DEFAULT_TRUSTED_DOMAINS)
+class TrailingPunctuationTest(unittest.TestCase):
+    """Доверенная ссылка со знаком препинания после нее остается доверенной"""
+    
+    def test_trusted_link_followed_by_punctuation(self, _):
+        for text in [
+            "see https://youtube.com, ok",
+            "www.youtube.com,",
+            "(https://youtu.be)",
+            "https://youtu.be.",
+        ]:
+            with self.subTest(text=text):
+                self.assertEqual(has_suspicious_links(text), (False, []))
+    
+    def test_untrusted_link_followed_by_punctuation(self, _):
+        self.assertTrue(has_suspicious_links("(https://evil.com)")[0])
+        self.assertTrue(has_suspicious_links("https://youtube.com.evil.ru,")[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+Тесты пакетного анализа сообщений OpenAI
+"""
+
+import asyncio
+import json
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+# Добавляем корень проекта в путь
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import openai_analyzer
+from openai_analyzer import OpenAIAnalyzer
+
+CLEAN = {"violation": False, "violation_type": None, "confidence": 0.1, "reason": "ok", "action": "none"}
+
+
+class FakeCompletions:
+    """Подмена запроса к API: запоминает промпты и отвечает чистым результатом"""
+    
+    def __init__(self):
+        self.prompts = []
+    
+    async def __call__(self, prompt, max_tokens):
+        self.prompts.append(prompt)
+        await asyncio.sleep(0.01)
+        if "JSON-массив из" in prompt:
+            count = len(json.loads(prompt.split('Сообщение для анализа: "', 1)[1].split("]", 1)[0] + "]"))
+            content = json.dumps({"results": [CLEAN] * count})
+        else:
+            content = json.dumps(CLEAN)
+        return {"choices": [{"message": {"content": content}}]}
+
+
+# Окно ожидания заведомо длиннее таймаутов теста: сообщение, попавшее в окно, не успеет
+@mock.patch.object(openai_analyzer, "ANALYSIS_BATCH_WINDOW", 10)
+class BatchingTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.analyzer = OpenAIAnalyzer(api_key="test-key", model="test-model")
+        self.completions = FakeCompletions()
+        self.analyzer._request_completion = self.completions
+    
+    def test_sequential_messages_are_sent_without_waiting(self):
+        async def scenario():
+            # Как в боте: следующее сообщение - только после ответа на предыдущее
+            for index in range(3):
+                result = await asyncio.wait_for(
+                    self.analyzer.analyze_message(f"Когда починят лифт в доме {index}?"), timeout=1
+                )
+                self.assertFalse(result.violation)
+            await self.analyzer.close()
+        
+        asyncio.run(scenario())
+        self.assertEqual(len(self.completions.prompts), 3)
+    
+    def test_messages_during_request_are_batched(self):
+        async def scenario():
+            first = asyncio.ensure_future(self.analyzer.analyze_message("Когда починят лифт?"))
+            await asyncio.sleep(0)  # первый запрос уже отправлен
+            others = [asyncio.ensure_future(self.analyzer.analyze_message(f"Вопрос про отопление {index}"))
+                      for index in range(3)]
+            await asyncio.wait_for(first, timeout=1)
+            # Остальные ждут окна, которое в тесте не истечет: отправляем пакет вручную
+            self.analyzer._flush_batch()
+            results = await asyncio.wait_for(asyncio.gather(*others), timeout=1)
+            self.assertTrue(all(result is not None for result in results))
+            await self.analyzer.close()
+        
+        asyncio.run(scenario())
+        self.assertEqual(len(self.completions.prompts), 2)
+
+
+
+class SessionTest(unittest.TestCase):
+    """HTTP-сессия прежнего цикла событий закрывается при создании новой"""
+    
+    def test_session_from_previous_loop_is_closed(self):
+        analyzer = OpenAIAnalyzer(api_key="test-key", model="test-model")
+        
+        # Первый запуск бота: сессия создана, цикл завершен без analyzer.close()
+        first_session = asyncio.run(analyzer._get_session())
+        self.assertFalse(first_session.closed)
+        
+        async def restart():
+            session = await analyzer._get_session()
+            await analyzer.close()
+            return session
+        
+        second_session = asyncio.run(restart())
+        self.assertIsNot(second_session, first_session)
+        self.assertTrue(first_session.closed)
+        self.assertTrue(second_session.closed)
+
+    
+    def test_analyzer_for_old_settings_is_closed(self):
+        with mock.patch.multiple(openai_analyzer.bot_config, OPENAI_API_KEY="old-key", OPENAI_MODEL="test-model"):
+            old_analyzer = openai_analyzer.create_analyzer(True)
+            self.assertIs(openai_analyzer.create_analyzer(True), old_analyzer)
+            old_session = asyncio.run(old_analyzer._get_session())
+        
+        with mock.patch.multiple(openai_analyzer.bot_config, OPENAI_API_KEY="new-key", OPENAI_MODEL="test-model"):
+            new_analyzer = openai_analyzer.create_analyzer(True)
+        
+        self.assertIsNot(new_analyzer, old_analyzer)
+        self.assertEqual(new_analyzer.api_key, "new-key")
+        self.assertTrue(old_session.closed)
+
+
+if __name__ == '__main__':
+    unittest.main()